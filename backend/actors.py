@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Optional
+
+from messages import Message
+from metrics import HANDLER_ERRORS, MESSAGES_REJECTED
+
+logger = logging.getLogger(__name__)
+
+# Comandos pendientes por sala; con la cola llena los sockets esperan su turno
+ROOM_INBOX_SIZE = int(os.environ.get("ROOM_INBOX_SIZE", "256"))
+
+Handle = Callable[[str, str, Message], Awaitable[None]]
+
+
+# Una tarea por sala es la única que toca su GameRoom: los comandos se
+# procesan de uno en uno y en orden, aunque el handler haga await
+class RoomActor:
+    __slots__ = ("room_code", "handle", "inbox", "processed", "task")
+
+    def __init__(self, room_code: str, handle: Handle, inbox_size: int = ROOM_INBOX_SIZE):
+        self.room_code = room_code
+        self.handle = handle
+        self.inbox: asyncio.Queue = asyncio.Queue(maxsize=inbox_size)
+        self.processed = 0
+        self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while True:
+            player_id, message = await self.inbox.get()
+            try:
+                await self.handle(self.room_code, player_id, message)
+            except Exception:
+                HANDLER_ERRORS.inc(message.type)
+                logger.exception("%s handler failed in room %s", message.type, self.room_code)
+            self.processed += 1
+
+    def stop(self):
+        self.task.cancel()
+
+
+class RoomActors:
+    def __init__(self, handle: Handle, exists: Callable[[str], bool], inbox_size: int = ROOM_INBOX_SIZE):
+        self.handle = handle
+        self.exists = exists
+        self.inbox_size = inbox_size
+        self.actors: Dict[str, RoomActor] = {}
+
+    def get(self, room_code: str) -> Optional[RoomActor]:
+        actor = self.actors.get(room_code)
+        if actor is None:
+            # Sin sala no se arranca tarea: evita fugas con códigos inventados
+            if not self.exists(room_code):
+                return None
+            actor = self.actors[room_code] = RoomActor(room_code, self.handle, self.inbox_size)
+        return actor
+
+    async def send(self, room_code: str, player_id: str, message: Message):
+        actor = self.get(room_code)
+        if actor:
+            await actor.inbox.put((player_id, message))
+
+    def send_nowait(self, room_code: str, player_id: str, message: Message) -> bool:
+        actor = self.get(room_code)
+        if actor is None:
+            return False
+        try:
+            actor.inbox.put_nowait((player_id, message))
+        except asyncio.QueueFull:
+            MESSAGES_REJECTED.inc(message.type, "room_inbox_full")
+            return False
+        return True
+
+    def stop(self, room_code: str):
+        actor = self.actors.pop(room_code, None)
+        if actor:
+            actor.stop()
+
+    def stop_all(self):
+        for room_code in list(self.actors):
+            self.stop(room_code)
+
+    def __len__(self) -> int:
+        return len(self.actors)
+
+    def stats(self) -> dict:
+        depths = [actor.inbox.qsize() for actor in self.actors.values()]
+        return {
+            "actors": len(self.actors),
+            "inbox_depth_max": max(depths, default=0),
+            "processed": sum(actor.processed for actor in self.actors.values()),
+        }
@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
+
+from decks import decks
+from game import Clue, GameRoom
+from metrics import ANALYTICS_EVENTS, ANALYTICS_WRITE_SECONDS
+from scoring import DIAL_MAX
+
+logger = logging.getLogger(__name__)
+
+# Base SQLite de analítica; vacío = no se guarda nada
+ANALYTICS_DB = os.environ.get("ANALYTICS_DB", "")
+# Eventos pendientes de escribir; si el disco no da abasto se descartan, nunca
+# se frena a las salas
+ANALYTICS_QUEUE_SIZE = int(os.environ.get("ANALYTICS_QUEUE_SIZE", "10000"))
+# Segundos que se agrupan los eventos en una sola transacción
+ANALYTICS_FLUSH_INTERVAL = float(os.environ.get("ANALYTICS_FLUSH_INTERVAL", "1"))
+# Anchura en grados de cada región del dial para el error medio
+ANALYTICS_REGION_WIDTH = int(os.environ.get("ANALYTICS_REGION_WIDTH", "30"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clues (
+    at REAL, room TEXT, mode TEXT, deck TEXT,
+    left_adjective TEXT, right_adjective TEXT, phrase TEXT, target INTEGER
+);
+CREATE TABLE IF NOT EXISTS dials (
+    at REAL, room TEXT, mode TEXT, deck TEXT, rules TEXT,
+    left_adjective TEXT, right_adjective TEXT, phrase TEXT,
+    target INTEGER, average REAL, guesses INTEGER, points INTEGER
+);
+CREATE TABLE IF NOT EXISTS pair_stats (
+    left_adjective TEXT, right_adjective TEXT,
+    dials INTEGER, hits INTEGER, points INTEGER, error REAL,
+    PRIMARY KEY (left_adjective, right_adjective)
+);
+CREATE TABLE IF NOT EXISTS region_stats (
+    region INTEGER PRIMARY KEY,
+    dials INTEGER, points INTEGER, error REAL, bias REAL
+);
+"""
+
+# Los agregados se suman en la misma transacción que guarda los eventos: los
+# informes leen unas pocas filas en vez de recorrer todas las pistas
+PAIR_UPSERT = """
+INSERT INTO pair_stats VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (left_adjective, right_adjective) DO UPDATE SET
+    dials = dials + excluded.dials, hits = hits + excluded.hits,
+    points = points + excluded.points, error = error + excluded.error
+"""
+REGION_UPSERT = """
+INSERT INTO region_stats VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (region) DO UPDATE SET
+    dials = dials + excluded.dials, points = points + excluded.points,
+    error = error + excluded.error, bias = bias + excluded.bias
+"""
+
+
+def region_of(target: int, width: int) -> int:
+    return min(target, DIAL_MAX - 1) // width
+
+
+# Pistas escritas y resultado de cada dial, fuera del camino de las salas: los
+# handlers solo añaden una tupla a una cola acotada y una tarea la vuelca por
+# lotes a SQLite desde un hilo, actualizando a la vez los agregados
+class Analytics:
+    def __init__(self, path: str = ANALYTICS_DB, max_pending: int = ANALYTICS_QUEUE_SIZE,
+                 flush_interval: float = ANALYTICS_FLUSH_INTERVAL, region_width: int = ANALYTICS_REGION_WIDTH):
+        self.path = path
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.region_width = region_width
+        self.buffer: List[tuple] = []
+        self.wakeup = asyncio.Event()
+        self.closing = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.conn: Optional[sqlite3.Connection] = None
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _put(self, event: tuple):
+        if len(self.buffer) >= self.max_pending:
+            self.dropped += 1
+            ANALYTICS_EVENTS.inc("dropped")
+            return
+        self.buffer.append(event)
+        ANALYTICS_EVENTS.inc(event[0])
+        self.wakeup.set()
+
+    def record_clue(self, room: GameRoom, clue: Clue):
+        if self.enabled:
+            self._put(("clue", time.time(), room.room_code, room.mode, room.deck,
+                       clue.left_adjective, clue.right_adjective, clue.phrase, clue.target_position))
+
+    def record_dial(self, room: GameRoom, points: int):
+        # Justo tras reveal_current: el último dial_log es el dial revelado
+        if not self.enabled or not room.dial_log or not room.dial_log[-1]["guesses"]:
+            return
+        dial = room.dial_log[-1]
+        clue = room.get_current_clue_info()
+        positions = [position for _, position in dial["guesses"]]
+        self._put(("dial", time.time(), room.room_code, room.mode, room.deck, room.rules.name,
+                   clue["left_adjective"], clue["right_adjective"], clue["phrase"],
+                   dial["target"], sum(positions) / len(positions), len(positions), points))
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        # WAL: los informes leen mientras el escritor añade lotes
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        self.conn = conn
+
+    async def start(self):
+        if self.enabled:
+            await asyncio.to_thread(self._open)
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.closing.set()
+        self.wakeup.set()
+        await self.task
+        self.task = None
+        # Lo que quedase en la cola se escribe antes de cerrar
+        await self.flush()
+        await asyncio.to_thread(self.conn.close)
+
+    async def run(self):
+        while not self.closing.is_set():
+            await self.wakeup.wait()
+            # Se espera un poco para que cada transacción cubra un lote; al
+            # cerrar no, se escribe lo pendiente enseguida
+            try:
+                await asyncio.wait_for(self.closing.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        events, self.buffer = self.buffer, []
+        if not events:
+            return
+        try:
+            await asyncio.to_thread(self._write, events)
+        except sqlite3.Error as e:
+            # Se pierde el lote: reintentarlo podría hacer crecer la cola sin límite
+            self.dropped += len(events)
+            logger.error("analytics write failed: %r", e)
+
+    def _write(self, events: List[tuple]):
+        start = time.perf_counter()
+        clues = [event[1:] for event in events if event[0] == "clue"]
+        dials = [event[1:] for event in events if event[0] == "dial"]
+        pairs: Dict[Tuple[str, str], list] = {}
+        regions: Dict[int, list] = {}
+        for dial in dials:
+            left, right, target, average, points = dial[5], dial[6], dial[8], dial[9], dial[11]
+            error = abs(average - target)
+            if left and right:
+                pair = pairs.setdefault((left, right), [0, 0, 0, 0.0])
+                pair[0] += 1
+                pair[1] += points > 0
+                pair[2] += points
+                pair[3] += error
+            region = regions.setdefault(region_of(target, self.region_width), [0, 0, 0.0, 0.0])
+            region[0] += 1
+            region[1] += points
+            region[2] += error
+            region[3] += average - target
+        with self.conn:
+            self.conn.executemany("INSERT INTO clues VALUES (?, ?, ?, ?, ?, ?, ?, ?)", clues)
+            self.conn.executemany("INSERT INTO dials VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", dials)
+            self.conn.executemany(PAIR_UPSERT, [(*pair, *totals) for pair, totals in pairs.items()])
+            self.conn.executemany(REGION_UPSERT, [(region, *totals) for region, totals in regions.items()])
+        self.written += len(events)
+        self.batches += 1
+        ANALYTICS_WRITE_SECONDS.observe(time.perf_counter() - start)
+
+    def report(self, deck: Optional[str] = None, min_dials: int = 1, limit: int = 50) -> dict:
+        # Bloqueante: se llama en un hilo, con su propia conexión de solo lectura
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            pairs = conn.execute(
+                "SELECT left_adjective, right_adjective, dials, hits, points, error FROM pair_stats "
+                "WHERE dials >= ? ORDER BY error / dials", (min_dials,)).fetchall()
+            regions = conn.execute("SELECT region, dials, points, error, bias FROM region_stats "
+                                   "ORDER BY region").fetchall()
+        finally:
+            conn.close()
+        if deck is not None:
+            in_deck = set(decks.get(deck).pairs)
+            pairs = [row for row in pairs if (row[0], row[1]) in in_deck]
+        return {
+            "pairs": [
+                {"left": left, "right": right, "dials": n, "hit_rate": round(hits / n, 3),
+                 "mean_points": round(points / n, 3), "mean_error": round(error / n, 2)}
+                for left, right, n, hits, points, error in pairs[:limit]
+            ],
+            "regions": [
+                {"from": region * self.region_width, "to": min(DIAL_MAX, (region + 1) * self.region_width),
+                 "dials": n, "mean_points": round(points / n, 3), "mean_error": round(error / n, 2),
+                 "bias": round(bias / n, 2)}
+                for region, n, points, error, bias in regions
+            ],
+        }
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "pending": len(self.buffer),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,101 @@
+"""Analytics: cost per event on the room path, batched SQLite writes, and reports
+from the incremental aggregates vs a GROUP BY over every dial.
+
+    python bench/bench_analytics.py --dials 200000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from analytics import Analytics  # noqa: E402
+from decks import decks  # noqa: E402
+from game import GameRoom  # noqa: E402
+
+FULL_SCAN = """
+SELECT left_adjective, right_adjective, COUNT(*), SUM(points > 0), SUM(points), SUM(ABS(average - target))
+FROM dials WHERE left_adjective IS NOT NULL AND right_adjective IS NOT NULL
+GROUP BY left_adjective, right_adjective ORDER BY SUM(ABS(average - target)) / COUNT(*)
+"""
+
+
+def revealed_room():
+    room = GameRoom("1000")
+    for i in range(4):
+        room.add_player(f"p{i}", f"Jugador {i}")
+        room.set_connected(f"p{i}", True)
+    room.start_round(3, "battery")
+    room.fill_missing_clues("pista")
+    room.start_guessing_phase()
+    owner = room.current_clue_owner_id
+    for pid in room.players:
+        if pid != owner:
+            room.submit_guess(pid, random.randint(0, 180))
+    reveal = room.reveal_current()
+    return room, reveal["points_this_dial"]
+
+
+def synthetic_events(count):
+    pairs = decks.get().pairs
+    events = []
+    for _ in range(count):
+        left, right = random.choice(pairs)
+        target = random.randint(5, 175)
+        average = min(180, max(0, random.gauss(target, 15)))
+        points = 4 if abs(average - target) <= 5 else 3 if abs(average - target) <= 11 else 0
+        events.append(("dial", time.time(), "1000", "battery", "es", "coop", left, right, "pista",
+                       target, average, 3, points))
+        events.append(("clue", time.time(), "1000", "battery", "es", left, right, "pista", target))
+    return events
+
+
+async def run(args):
+    random.seed(1)
+    with tempfile.TemporaryDirectory() as directory:
+        analytics = Analytics(os.path.join(directory, "analytics.db"), max_pending=10 ** 9)
+        await analytics.start()
+
+        room, points = revealed_room()
+        n = 100000
+        start = time.perf_counter()
+        for _ in range(n):
+            analytics.record_dial(room, points)
+        record_us = (time.perf_counter() - start) * 1e6 / n
+        analytics.buffer.clear()
+        print(f"record_dial on the room path: {record_us:.2f} us/event")
+
+        events = synthetic_events(args.dials)
+        start = time.perf_counter()
+        for i in range(0, len(events), args.batch):
+            await asyncio.to_thread(analytics._write, events[i:i + args.batch])
+        write_s = time.perf_counter() - start
+        print(f"write {len(events)} events in batches of {args.batch}: {write_s:.2f}s "
+              f"({len(events) / write_s:,.0f} events/s, {analytics.batches} transactions)")
+
+        start = time.perf_counter()
+        report = analytics.report(limit=10 ** 6)
+        report_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        scanned = analytics.conn.execute(FULL_SCAN).fetchall()
+        scan_ms = (time.perf_counter() - start) * 1000
+        aggregated = {(pair["left"], pair["right"]): (pair["dials"], pair["mean_error"]) for pair in report["pairs"]}
+        assert aggregated == {(row[0], row[1]): (row[2], round(row[5] / row[2], 2)) for row in scanned}
+        print(f"report over {args.dials} dials: aggregates {report_ms:.1f} ms | "
+              f"GROUP BY over dials {scan_ms:.1f} ms ({scan_ms / report_ms:,.0f}x)")
+        await analytics.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dials", type=int, default=200000)
+    parser.add_argument("--batch", type=int, default=2000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Concurrent game completions: old whole-file rewrite vs Leaderboard.
+
+    python bench/bench_highscores.py --games 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from highscores import Leaderboard  # noqa: E402
+
+
+def legacy_register(path, total_dials, score, player_names):
+    # Comportamiento anterior: leer, ordenar y reescribir todo el fichero
+    highscores = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            highscores = json.load(f)
+    key = str(total_dials)
+    highscores.setdefault(key, []).append({
+        "score": score,
+        "players": player_names,
+        "date": date.today().isoformat(),
+    })
+    highscores[key].sort(key=lambda x: x["score"], reverse=True)
+    highscores[key] = highscores[key][:5]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(highscores, f, ensure_ascii=False, indent=2)
+    return highscores[key]
+
+
+async def lag_probe(samples, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        samples.append(time.perf_counter() - start - 0.001)
+
+
+async def run(name, register, games, flush=None):
+    samples = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(lag_probe(samples, stop))
+
+    async def finish_game():
+        await asyncio.sleep(random.random() * 0.05)
+        total_dials = random.choice([4, 6, 8, 9, 12])
+        register(total_dials, random.randint(0, 4 * total_dials), ["A", "B", "C"])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(finish_game() for _ in range(games)))
+    if flush:
+        await flush()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    samples.sort()
+    p99 = samples[int(len(samples) * 0.99)] if samples else 0.0
+    print(f"{name:>12}: {games} games in {elapsed * 1000:8.1f} ms | "
+          f"loop lag max {max(samples, default=0) * 1000:6.2f} ms p99 {p99 * 1000:6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.json")
+        asyncio.run(run("legacy", lambda *a: legacy_register(legacy_path, *a), args.games))
+
+        board = Leaderboard(os.path.join(tmp, "board.json"), flush_delay=0.01)
+        board.load()
+        asyncio.run(run("leaderboard", board.register, args.games, board.flush))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Room journal: cost per message, batched vs per-entry fsync, and restore time.
+
+    python bench/bench_journal.py --rooms 10000 --entries 50000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from game import GameRoom  # noqa: E402
+from journal import SNAPSHOT_FILE, Journal  # noqa: E402
+
+
+def make_room(code, players):
+    room = GameRoom(code)
+    for i in range(players):
+        room.add_player(f"p{i}", f"Jugador {i}")
+    room.start_round(3, "battery")
+    room.fill_missing_clues("pista")
+    room.start_guessing_phase()
+    return room
+
+
+def per_entry_fsync(path, lines):
+    # Alternativa sin agrupar: un write + fsync por entrada
+    with open(path, "a", encoding="utf-8") as f:
+        for line in lines:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+async def run(args):
+    random.seed(1)
+    rooms = {str(100000 + i): make_room(str(100000 + i), args.players) for i in range(args.rooms)}
+    codes = list(rooms)
+
+    with tempfile.TemporaryDirectory() as directory:
+        journal = Journal(directory, flush_interval=0.01, compact_entries=10 ** 9, compact_interval=10 ** 9)
+        journal.restore()
+        journal.start()
+        for room in rooms.values():
+            journal.save(room)
+
+        # Coste en el bucle de encolar una adivinanza (lo que paga cada mensaje)
+        picks = [(rooms[random.choice(codes)], f"p{i % args.players}", random.randint(0, 180))
+                 for i in range(args.entries)]
+        for room, player_id, position in picks:
+            room.submit_guess(player_id, position)
+        start = time.perf_counter()
+        for room, player_id, position in picks:
+            journal.record(room, "guess", player_id, position)
+        delta_us = (time.perf_counter() - start) * 1e6 / args.entries
+        n = min(1000, len(codes))
+        start = time.perf_counter()
+        for code in codes[:n]:
+            journal.save(rooms[code])
+        save_us = (time.perf_counter() - start) * 1e6 / n
+        print(f"record guess: {delta_us:.2f} us/entry | save room ({args.players} players): {save_us:.1f} us")
+
+        start = time.perf_counter()
+        while journal.buffer or journal.written < len(rooms) + args.entries + n:
+            await asyncio.sleep(0.005)
+        batched = time.perf_counter() - start
+        print(f"batched fsync: {journal.written} entries in {batched * 1000:.0f} ms "
+              f"({journal.batches} batches, {journal.written / batched:,.0f} entries/s)")
+
+        sample = [f'["guess","{random.choice(codes)}","p1",{i % 181}]' for i in range(2000)]
+        start = time.perf_counter()
+        await asyncio.to_thread(per_entry_fsync, os.path.join(directory, "single.log"), sample)
+        single = time.perf_counter() - start
+        print(f"per-entry fsync: {len(sample)} entries in {single * 1000:.0f} ms ({len(sample) / single:,.0f} entries/s)")
+        os.remove(os.path.join(directory, "single.log"))
+
+        # Compactar: lo que se bloquea el bucle (hasta el primer await) y lo que tarda en total
+        stall = []
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        loop.call_soon(lambda: stall.append(time.perf_counter() - start))
+        await journal.compact()
+        total = time.perf_counter() - start
+        size = os.path.getsize(os.path.join(directory, SNAPSHOT_FILE))
+        print(f"compact {len(rooms)} rooms: loop blocked {stall[0] * 1000:.1f} ms, total {total * 1000:.0f} ms, "
+              f"snapshot {size / 1024 / 1024:.1f} MiB")
+
+        # Cola tras el snapshot: lo que habría que reproducir tras un corte
+        for room, player_id, position in picks:
+            room.cancel_guess(player_id)
+            journal.record(room, "cancel", player_id)
+        while journal.buffer:
+            await asyncio.sleep(0.005)
+        journal.closing = True
+        journal.wakeup.set()
+        await journal.task
+
+        fresh = Journal(directory)
+        restored = await asyncio.to_thread(fresh.restore)
+        assert all(restored[code].to_state() == room.to_state() for code, room in rooms.items())
+        print(f"restore {len(restored)} rooms + {args.entries} entries: {fresh.restore_seconds * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rooms", type=int, default=10000)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--entries", type=int, default=50000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Public lobby: quick-join and paginated listing, linear scan vs the lobby index.
+
+    python bench/bench_lobby.py --rooms 5000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from game import GameRoom  # noqa: E402
+from lobby import LobbyIndex, listing_key  # noqa: E402
+
+
+def make_rooms(count, seats):
+    rooms = {}
+    for i in range(count):
+        room = GameRoom(str(10000 + i))
+        room.public = random.random() < 0.8
+        room.mode = random.choice(("free", "battery"))
+        room.num_rounds = random.randint(1, 5)
+        for p in range(random.randint(0, seats)):
+            room.add_player(f"p{p}", f"Jugador {p}")
+        rooms[room.room_code] = room
+    return rooms
+
+
+def scan_quick_join(rooms, seats, mode, num_rounds):
+    # Lo que haría falta sin índice: recorrer todas las salas
+    best = None
+    for room in rooms.values():
+        key = listing_key(room, seats)
+        if key and key[0] == mode and key[1] == num_rounds and (best is None or key[2:] < best[2:]):
+            best = key
+    return best[3] if best else None
+
+
+def scan_page(rooms, seats, mode, num_rounds, page, limit):
+    keys = sorted(key for key in (listing_key(room, seats) for room in rooms.values())
+                  if key and key[0] == mode and key[1] == num_rounds)
+    return keys[page * limit:(page + 1) * limit]
+
+
+def timed(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        result = fn()
+    return result, (time.perf_counter() - start) / n
+
+
+async def run(args):
+    random.seed(1)
+    rooms = make_rooms(args.rooms, args.seats)
+    index = LobbyIndex(args.seats)
+    start = time.perf_counter()
+    for room in rooms.values():
+        index.update(room)
+    print(f"{args.rooms} rooms, {len(index)} listed; index built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    # Lo que paga cada mensaje: update con la clave sin cambios y con cambio de plazas
+    n = min(1000, len(rooms))
+    sample = random.sample(list(rooms.values()), n)
+    _, same = timed(lambda: [index.update(room) for room in sample], 10)
+    start = time.perf_counter()
+    for room in sample:
+        room.add_player("extra", "Extra")
+        index.update(room)
+        room.remove_player("extra")
+        index.update(room)
+    changed = (time.perf_counter() - start) / (2 * n)
+    print(f"  update: unchanged {same * 1e6 / n:.2f} us | changed {changed * 1e6:.2f} us")
+
+    code, scan_s = timed(lambda: scan_quick_join(rooms, args.seats, "free", 3), 20)
+    indexed = await index.quick_join("free", 3)
+    assert code == indexed, (code, indexed)
+    start = time.perf_counter()
+    for _ in range(1000):
+        await index.quick_join("free", 3)
+    index_s = (time.perf_counter() - start) / 1000
+    print(f"  quick-join: scan {scan_s * 1e6:9.1f} us | index {index_s * 1e6:6.1f} us ({scan_s / index_s:,.0f}x)")
+
+    keys, cursor, pages = [], None, 0
+    start = time.perf_counter()
+    while True:
+        page, cursor = await index.page("free", 3, cursor, args.limit)
+        keys += page
+        pages += 1
+        if cursor is None:
+            break
+    index_s = (time.perf_counter() - start) / pages
+    last, scan_s = timed(lambda: scan_page(rooms, args.seats, "free", 3, pages - 1, args.limit), 5)
+    assert keys[-len(last):] == last
+    print(f"  listing ({pages} pages of {args.limit}): scan {scan_s * 1e6:9.1f} us/page | "
+          f"index {index_s * 1e6:6.1f} us/page ({scan_s / index_s:,.0f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rooms", type=int, default=5000)
+    parser.add_argument("--seats", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=20)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Memory per room and CPU per guessing message for the game model.
+
+    python bench/bench_model.py --rooms 10000 --players 6
+    python bench/bench_model.py --against e6b25ac   # compare with an older game.py
+"""
+import argparse
+import importlib.util
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+
+
+def load_game(rev=None):
+    path = os.path.join(BACKEND_DIR, "game.py")
+    if rev:
+        source = subprocess.check_output(["git", "show", f"{rev}:backend/game.py"], cwd=BACKEND_DIR)
+        tmp = tempfile.NamedTemporaryFile(suffix=".py", delete=False)
+        tmp.write(source)
+        tmp.close()
+        path = tmp.name
+    spec = importlib.util.spec_from_file_location(f"game_{rev or 'current'}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Adapter:
+    # Modelo actual: conexión y contadores dentro de la sala
+    def __init__(self, game):
+        self.game = game
+
+    def connect(self, room, pid):
+        room.set_connected(pid, True)
+
+    def move_needle(self, room, pid, position):
+        room.last_needle_position = position
+        room.clear_ready()
+        return room.ready_counts()
+
+    def submit_guess(self, room, pid, position):
+        room.submit_guess(pid, position)
+        return room.ready_counts(), room.all_active_guessed()
+
+
+class LegacyAdapter(Adapter):
+    # Modelo anterior: los conectados viven fuera y cada mensaje recorre la sala
+    def __init__(self, game):
+        super().__init__(game)
+        self.connections = {}
+
+    def connect(self, room, pid):
+        self.connections.setdefault(room.room_code, {})[pid] = None
+
+    def counts(self, room):
+        owner_id = room.current_clue_owner_id
+        active_pids = set(self.connections.get(room.room_code, {}).keys())
+        total = sum(1 for pid in active_pids if pid in room.players and pid != owner_id)
+        ready = sum(1 for pid in active_pids if pid in room.players and pid != owner_id and room.players[pid].has_guessed)
+        return ready, total
+
+    def move_needle(self, room, pid, position):
+        room.last_needle_position = position
+        for other, p in room.players.items():
+            if other != room.current_clue_owner_id:
+                p.has_guessed = False
+        return self.counts(room)
+
+    def submit_guess(self, room, pid, position):
+        room.submit_guess(pid, position)
+        ready, total = self.counts(room)
+        owner_id = room.current_clue_owner_id
+        active = set(self.connections.get(room.room_code, {}).keys())
+        guessers = [p for p in active if p in room.players and p != owner_id]
+        return (ready, total), bool(guessers) and all(room.players[p].has_guessed for p in guessers)
+
+
+def build_rooms(game, adapter, rooms, players):
+    result = []
+    for r in range(rooms):
+        room = game.GameRoom(str(r))
+        for i in range(players):
+            pid = f"p{i}"
+            adapter.connect(room, pid)
+            room.add_player(pid, f"Player {i}")
+        room.start_round(2, "free")
+        for pid in room.players:
+            for _ in range(2):
+                room.submit_clue(pid, "clue")
+        room.start_guessing_phase()
+        result.append(room)
+    return result
+
+
+def bench(label, game, adapter, args):
+    random.seed(1)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rooms = build_rooms(game, adapter, args.rooms, args.players)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    pids = [f"p{i}" for i in range(args.players)]
+    start = time.perf_counter()
+    messages = 0
+    for _ in range(args.messages // len(rooms) or 1):
+        for room in rooms:
+            pid = random.choice(pids)
+            if random.random() < 0.8:
+                adapter.move_needle(room, pid, random.randint(0, 180))
+            else:
+                adapter.submit_guess(room, pid, random.randint(0, 180))
+            messages += 1
+    elapsed = time.perf_counter() - start
+    print(f"{label:>10}: {(after - before) / args.rooms:9.0f} bytes/room | "
+          f"{elapsed / messages * 1e6:6.2f} us/message ({messages} messages, {args.rooms} rooms x {args.players} players)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rooms", type=int, default=10000)
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--against", metavar="REV", help="also run the game.py from this git revision")
+    args = parser.parse_args()
+
+    game = load_game()
+    bench("current", game, Adapter(game), args)
+    if args.against:
+        old = load_game(args.against)
+        adapter = Adapter(old) if hasattr(old.GameRoom, "ready_counts") else LegacyAdapter(old)
+        bench(args.against, old, adapter, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Per-room phase deadlines: one call_later per deadline vs DeadlineScheduler.
+
+    python bench/bench_scheduler.py --rooms 10000 --phases 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from scheduler import DeadlineScheduler  # noqa: E402
+
+
+class CallLater:
+    # Alternativa directa: un TimerHandle por sala, cancelado al cambiar de fase
+    def __init__(self):
+        self.handles = {}
+
+    def schedule(self, room_code, kind, delay, callback):
+        old = self.handles.get(room_code)
+        if old:
+            old.cancel()
+        self.handles[room_code] = asyncio.get_running_loop().call_later(delay, callback)
+
+    def cancel(self, room_code, kind=None):
+        handle = self.handles.pop(room_code, None)
+        if handle:
+            handle.cancel()
+
+
+def reschedule(scheduler, codes, phases, callback):
+    # Cada cambio de fase reprograma el plazo de la sala (el anterior se cancela)
+    for _ in range(phases):
+        for code in codes:
+            scheduler.schedule(code, "phase", 60 + random.random() * 60, callback)
+
+
+async def run(name, make, rooms, phases):
+    fired = 0
+
+    def expire():
+        nonlocal fired
+        fired += 1
+
+    codes = [str(1000 + i) for i in range(rooms)]
+    scheduler = make()
+    start = time.perf_counter()
+    reschedule(scheduler, codes, phases, expire)
+    schedule_s = time.perf_counter() - start
+    # Y al final todas vencen casi a la vez
+    for code in codes:
+        scheduler.schedule(code, "phase", random.random() * 0.05, expire)
+    start = time.perf_counter()
+    while fired < rooms:
+        await asyncio.sleep(0.01)
+    fire_s = time.perf_counter() - start
+
+    # La memoria se mide aparte: tracemalloc deforma los tiempos
+    tracemalloc.start()
+    reschedule(make(), codes, phases, expire)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:>12}: {rooms * phases} reschedules in {schedule_s * 1000:7.1f} ms | "
+          f"peak {peak / 1024:8.1f} KiB | {rooms} expiries in {fire_s * 1000:6.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rooms", type=int, default=10000)
+    parser.add_argument("--phases", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run("call_later", CallLater, args.rooms, args.phases))
+    asyncio.run(run("heap", DeadlineScheduler, args.rooms, args.phases))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Scoring: hard-coded thresholds vs lookup table, and batch rescoring of games.
+
+    python bench/bench_scoring.py --games 5000
+    python bench/bench_scoring.py --records games.jsonl --zones 6:4,12:3,20:2
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from scoring import (  # noqa: E402
+    RULE_SETS, Cooperative, PerPlayer, TeamsWithBonus, load_records, load_numpy, pack, parse_zones, rescore, rescore_batch,
+)
+
+
+def legacy_points(target, positions):
+    # calculate_points_current anterior: media en coma flotante y umbrales fijos
+    diff = abs(sum(positions) / len(positions) - target)
+    if diff <= 5:
+        return 4
+    if diff <= 11:
+        return 3
+    if diff <= 19:
+        return 2
+    return 0
+
+
+def synthetic_games(count, dials, players):
+    games = []
+    for _ in range(count):
+        game = []
+        for _ in range(dials):
+            target = random.randint(5, 175)
+            guesses = [
+                [seat % 2, min(180, max(0, int(random.gauss(target, 20))))]
+                for seat in range(random.randint(1, players - 1))
+            ]
+            game.append({"target": target, "owner_team": random.randint(0, 1), "guesses": guesses})
+        games.append({"scoring": "coop", "dials": game})
+    return games
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=5000)
+    parser.add_argument("--dials", type=int, default=12)
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--records", help="JSONL de partidas grabadas con GAME_RECORDS_FILE")
+    parser.add_argument("--zones", help="zonas alternativas, p. ej. 6:4,12:3,20:2")
+    args = parser.parse_args()
+
+    random.seed(1)
+    np = load_numpy()
+    games = load_records(args.records) if args.records else synthetic_games(args.games, args.dials, args.players)
+    dials = [d for game in games for d in game["dials"] if d["guesses"]]
+    print(f"{len(games)} games, {len(dials)} dials")
+
+    coop = RULE_SETS["coop"]
+    positions = [(d["target"], [p for _, p in d["guesses"]]) for d in dials]
+    guesses = [(d["target"], [("", t, p) for t, p in d["guesses"]]) for d in dials]
+    legacy, legacy_s = timed(lambda: [legacy_points(target, p) for target, p in positions])
+    table, table_s = timed(lambda: [coop.score(target, g).points for target, g in guesses])
+    assert legacy == table, "lookup table disagrees with the old thresholds"
+    print(f"  live coop: thresholds {legacy_s * 1e6 / len(dials):.2f} us/dial | "
+          f"table {table_s * 1e6 / len(dials):.2f} us/dial")
+
+    zones = parse_zones(args.zones) if args.zones else None
+    if np is not None:
+        batch, pack_s = timed(lambda: pack(games))
+        print(f"  pack once: {pack_s * 1000:.1f} ms")
+    for cls in (Cooperative, PerPlayer, TeamsWithBonus):
+        rules = cls(zones) if zones else RULE_SETS[cls.name]
+        slow, slow_s = timed(lambda: rescore(games, rules))
+        line = f"  {rules.name:>10}: python {slow_s * 1000:8.1f} ms"
+        if np is not None:
+            fast, fast_s = timed(lambda: rescore_batch(batch, rules))
+            assert fast == slow, f"{rules.name}: numpy and python disagree"
+            line += f" | numpy {fast_s * 1000:7.1f} ms ({slow_s / fast_s:5.1f}x)"
+        line += f" | mean total {sum(slow) / max(1, len(slow)):.2f}"
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Spectators: fan-out cost of a large audience as players vs the spectator feed.
+
+    python bench/bench_spectators.py --viewers 500 --seconds 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from broadcaster import Broadcaster  # noqa: E402
+from needle import NEEDLE_TICK_HZ  # noqa: E402
+from spectators import SpectatorFeed  # noqa: E402
+
+
+class FakeSocket:
+    def __init__(self):
+        self.frames = 0
+
+    async def send_text(self, text):
+        self.frames += 1
+
+    async def close(self):
+        pass
+
+
+async def play(deliver, seconds: float):
+    # Lo que sale de una sala en plena adivinanza: la aguja a NEEDLE_TICK_HZ y
+    # de vez en cuando un "listo"; se mide lo que tarda el bucle en volver
+    tick = 1.0 / NEEDLE_TICK_HZ
+    lags = []
+    cost = 0.0
+    events = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        text = json.dumps({"type": "needle_moved", "position": events % 181, "player_id": "p1"})
+        if events % 25 == 24:
+            text = json.dumps({"type": "player_ready", "player_id": "p2", "is_ready": True,
+                               "ready_count": 1, "total_guessers": 2, "v": events})
+        start = time.perf_counter()
+        deliver(text)
+        cost += time.perf_counter() - start
+        events += 1
+        await asyncio.sleep(tick)
+        lags.append(time.perf_counter() - start - tick)
+    await asyncio.sleep(0.5)
+    lags.sort()
+    return events, cost, lags[len(lags) * 99 // 100]
+
+
+async def as_players(viewers: int, seconds: float):
+    broadcaster = Broadcaster(max_queue=10 ** 6)
+    sockets = [FakeSocket() for _ in range(viewers + 2)]
+    for i, socket in enumerate(sockets):
+        broadcaster.add("1000", f"p{i}", socket)
+    events, cost, lag = await play(lambda text: broadcaster.broadcast_text("1000", text), seconds)
+    # Se espera a que se vacíen las colas para no medirlas en la siguiente pasada
+    writers = [conn.task for conn in broadcaster.connections["1000"].values()]
+    broadcaster.close_room("1000")
+    await asyncio.gather(*writers)
+    return events, cost, lag, sum(s.frames for s in sockets[2:])
+
+
+async def as_spectators(viewers: int, seconds: float, fanout: int):
+    broadcaster = Broadcaster()
+    feed = SpectatorFeed(fanout=fanout, max_spectators=viewers)
+    players = [FakeSocket() for _ in range(2)]
+    for i, socket in enumerate(players):
+        broadcaster.add("1000", f"p{i}", socket)
+    sockets = [FakeSocket() for _ in range(viewers)]
+    for i, socket in enumerate(sockets):
+        feed.add("1000", f"~{i}", socket)
+
+    def deliver(text):
+        broadcaster.broadcast_text("1000", text)
+        feed.publish("1000", text)
+
+    events, cost, lag = await play(deliver, seconds)
+    feed.close_room("1000")
+    broadcaster.close_room("1000")
+    return events, cost, lag, sum(s.frames for s in sockets)
+
+
+def report(name, viewers, result):
+    events, cost, lag, frames = result
+    print(f"{name:>12}: {cost * 1e6 / events:8.1f} us/event on the room path | "
+          f"{frames / viewers:6.1f} frames/viewer | p99 loop lag {lag * 1000:6.2f} ms")
+
+
+async def run(args):
+    print(f"{args.viewers} viewers, {args.seconds:.0f}s of needle at {NEEDLE_TICK_HZ:.0f} Hz")
+    report("as players", args.viewers, await as_players(args.viewers, args.seconds))
+    report("spectators", args.viewers, await as_spectators(args.viewers, args.seconds, args.fanout))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--viewers", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--fanout", type=int, default=64)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
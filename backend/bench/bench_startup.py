@@ -0,0 +1,122 @@
+"""Startup: import cost of `main` and cold start to /health and /ready.
+
+    python bench/bench_startup.py --runs 5
+    python bench/bench_startup.py --rooms 10000 --budget 3
+"""
+import argparse
+import asyncio
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+
+
+def import_profile(top: int):
+    # -X importtime escribe en stderr "import time: self | cumulative | módulo"
+    # con sangría por nivel: los hijos directos de main son lo que cuesta cada import
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                         cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stderr
+    direct, total = [], 0
+    for line in out.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)", line)
+        if not match:
+            continue
+        if len(match.group(3)) == 3:
+            direct.append((int(match.group(2)), match.group(4)))
+        elif match.group(4) == "main" and len(match.group(3)) == 1:
+            total = int(match.group(2))
+    print(f"import main: {total / 1000:.0f} ms")
+    for us, name in sorted(direct, reverse=True)[:top]:
+        print(f"  {name:<24} {us / 1000:7.1f} ms")
+
+
+def populate(directory: str, rooms: int, players: int):
+    # Salas en el journal para medir lo que cuesta restaurarlas al arrancar
+    from bench_journal import make_room
+    from journal import Journal
+
+    async def fill():
+        journal = Journal(directory, compact_entries=10 ** 9, compact_interval=10 ** 9)
+        journal.restore()
+        journal.start()
+        for i in range(rooms):
+            journal.save(make_room(str(100000 + i), players))
+        await journal.stop()
+
+    asyncio.run(fill())
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def poll(url: str, deadline: float) -> bool:
+    while time.perf_counter() < deadline:
+        try:
+            urllib.request.urlopen(url)
+            return True
+        except OSError:
+            # Sin conectar todavía o 503 mientras calienta
+            pass
+        time.sleep(0.005)
+    return False
+
+
+def cold_start(env: dict, timeout: float):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+                               "--log-level", "warning"], cwd=BACKEND_DIR, env=env)
+    try:
+        if not poll(f"{url}/health", start + timeout):
+            raise RuntimeError("server did not listen")
+        listening = time.perf_counter() - start
+        if not poll(f"{url}/ready", start + timeout):
+            raise RuntimeError("server did not become ready")
+        return listening, time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("--rooms", type=int, default=0, help="salas en el journal al arrancar")
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--budget", type=float, help="falla si la mediana hasta /ready supera estos segundos")
+    args = parser.parse_args()
+
+    import_profile(args.top)
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "HIGHSCORES_FILE": os.path.join(tmp, "highscores.json")}
+        if args.rooms:
+            env["JOURNAL_DIR"] = os.path.join(tmp, "journal")
+            start = time.perf_counter()
+            populate(env["JOURNAL_DIR"], args.rooms, args.players)
+            print(f"journal with {args.rooms} rooms written in {time.perf_counter() - start:.1f}s")
+        runs = [cold_start(env, args.timeout) for _ in range(args.runs)]
+    listening = statistics.median(r[0] for r in runs)
+    ready = statistics.median(r[1] for r in runs)
+    print(f"cold start ({args.runs} runs, median): listening {listening * 1000:.0f} ms | "
+          f"ready {ready * 1000:.0f} ms (max {max(r[1] for r in runs) * 1000:.0f} ms)")
+    if args.budget is not None and ready > args.budget:
+        print(f"over budget: {ready:.2f}s > {args.budget:.2f}s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
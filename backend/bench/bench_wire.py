@@ -0,0 +1,40 @@
+"""Bytes and encode/decode CPU per frame: JSON vs compact wire protocol.
+
+    python bench/bench_wire.py
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from wire import compact_frame, decode_compact  # noqa: E402
+
+MESSAGES = {
+    "needle_moved": {"type": "needle_moved", "position": 97, "player_id": "k3j9x0ab"},
+    "needle_moved+counts": {"type": "needle_moved", "position": 97, "player_id": "k3j9x0ab",
+                            "ready_count": 3, "total_guessers": 7},
+    "player_ready": {"type": "player_ready", "player_id": "k3j9x0ab", "is_ready": True,
+                     "ready_count": 3, "total_guessers": 7, "v": 4182},
+}
+
+
+def main():
+    n = 100000
+    print(f"{'message':>20} {'json B':>7} {'compact B':>9} {'json enc us':>11} {'compact enc us':>14} "
+          f"{'json dec us':>11} {'compact dec us':>14}")
+    for name, message in MESSAGES.items():
+        text = json.dumps(message)
+        frame = compact_frame(text)
+        # El servidor ya tiene el JSON; el coste extra del binario es compact_frame
+        json_enc = timeit.timeit(lambda: json.dumps(message), number=n) / n * 1e6
+        compact_enc = timeit.timeit(lambda: compact_frame(text), number=n) / n * 1e6
+        json_dec = timeit.timeit(lambda: json.loads(text), number=n) / n * 1e6
+        compact_dec = timeit.timeit(lambda: decode_compact(frame), number=n) / n * 1e6
+        print(f"{name:>20} {len(text):>7} {len(frame):>9} {json_enc:>11.2f} {compact_enc:>14.2f} "
+              f"{json_dec:>11.2f} {compact_dec:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""Load test: N rooms x M bots playing full games against a local server.
+
+    python bench/loadtest.py --rooms 50 --players 6 --rounds 2
+    python bench/loadtest.py --rooms 50 --players 6 --save-baseline local
+    python bench/loadtest.py --rooms 50 --players 6 --compare local
+    python bench/loadtest.py --rooms 50 --workers 4 --redis-url redis://localhost:6379/0
+
+By default a fresh `uvicorn main:app` is started on a free port; use --url to
+target an already running server instead (CPU/RSS are then not reported).
+More than one worker needs the redis backend: rooms and sockets land on
+different workers.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+
+import websockets
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+
+from wire import decode_compact  # noqa: E402
+BASELINES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+# Qué respuesta del servidor cierra cada petición para medir su latencia
+RESPONSES = {
+    "start_round": ("round_started",),
+    "submit_clue": ("next_writing", "writing_progress", "guessing_started"),
+    "move_needle": ("needle_moved",),
+    "submit_guess": ("player_ready",),
+    "next_clue": ("guessing_started", "game_finished"),
+}
+
+
+class Metrics:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.sent = 0
+        self.received = 0
+        self.bytes_received = 0
+        self.games = 0
+        self.errors = 0
+
+    def summary(self, elapsed: float) -> dict:
+        result = {
+            "elapsed_s": round(elapsed, 3),
+            "games": self.games,
+            "errors": self.errors,
+            "sent": self.sent,
+            "received": self.received,
+            "msgs_per_s": round((self.sent + self.received) / elapsed, 1) if elapsed else 0,
+            "bytes_received": self.bytes_received,
+            "latency_ms": {},
+        }
+        everything = []
+        for msg_type, values in sorted(self.latencies.items()):
+            everything.extend(values)
+            result["latency_ms"][msg_type] = percentiles(values)
+        result["latency_ms"]["all"] = percentiles(everything)
+        return result
+
+
+def percentiles(values) -> dict:
+    if not values:
+        return {"p50": 0.0, "p99": 0.0, "n": 0}
+    values = sorted(values)
+    return {
+        "p50": round(values[len(values) // 2] * 1000, 3),
+        "p99": round(values[min(len(values) - 1, int(len(values) * 0.99))] * 1000, 3),
+        "n": len(values),
+    }
+
+
+class Bot:
+    def __init__(self, ws_url: str, room_code: str, player_id: str, metrics: Metrics, args):
+        self.url = f"{ws_url}/ws/{room_code}/{player_id}?proto={args.proto}"
+        self.player_id = player_id
+        self.metrics = metrics
+        self.args = args
+        self.pending = {}
+        self.ws = None
+        self.guess = None
+
+    async def send(self, message: dict):
+        self.pending.setdefault(message["type"], time.perf_counter())
+        self.metrics.sent += 1
+        await self.ws.send(json.dumps(message))
+
+    def resolve(self, message: dict):
+        msg_type = message.get("type")
+        for request, responses in RESPONSES.items():
+            if msg_type in responses and request in self.pending:
+                if request == "submit_guess" and message.get("player_id") != self.player_id:
+                    continue
+                self.metrics.latencies[request].append(time.perf_counter() - self.pending.pop(request))
+
+    async def recv(self) -> dict:
+        data = await self.ws.recv()
+        self.metrics.received += 1
+        self.metrics.bytes_received += len(data)
+        message = json.loads(data) if isinstance(data, str) else decode_compact(data)
+        self.resolve(message)
+        return message
+
+    async def play(self, num_players: int):
+        self.ws = await websockets.connect(self.url, max_queue=None)
+        try:
+            await self.send({"type": "join", "name": self.player_id})
+            await self.loop(num_players)
+        finally:
+            await self.ws.close()
+
+    async def loop(self, num_players: int):
+        games = 0
+        started = False
+        is_host = False
+        while True:
+            message = await self.recv()
+            msg_type = message.get("type")
+            # Anfitrión es quien diga el servidor (el primero en entrar), no el primer bot
+            if "host_id" in message:
+                is_host = message["host_id"] == self.player_id
+            if msg_type == "game_state" and is_host and not started and len(message["players"]) >= num_players:
+                # Se empieza cuando el servidor ya tiene a todos dentro: con
+                # varios workers los join pueden llegar después que el aviso local
+                started = True
+                await self.send({"type": "start_round", "num_rounds": self.args.rounds, "mode": "battery"})
+            elif msg_type in ("round_started", "next_writing"):
+                await asyncio.sleep(random.random() * self.args.think)
+                await self.send({"type": "submit_clue", "phrase": f"clue {self.player_id}"})
+            elif msg_type == "guessing_started":
+                self.guess = None
+                if message["clue"]["owner_id"] != self.player_id:
+                    asyncio.create_task(self.make_guess())
+            elif msg_type == "needle_moved" and self.guess is not None and message["player_id"] != self.player_id:
+                # Otro ha movido la aguja y ha anulado nuestro "listo": se vuelve a confirmar
+                await self.send({"type": "submit_guess", "position": self.guess})
+            elif msg_type == "clue_reveal" and is_host:
+                await self.send({"type": "next_clue"})
+            elif msg_type == "game_finished":
+                games += 1
+                if is_host:
+                    self.metrics.games += 1
+                if games >= self.args.games:
+                    return
+                if is_host:
+                    await self.send({"type": "start_round", "num_rounds": self.args.rounds, "mode": "battery"})
+
+    async def make_guess(self):
+        position = random.randint(0, 180)
+        try:
+            for _ in range(self.args.needle_moves):
+                position = max(0, min(180, position + random.randint(-10, 10)))
+                await self.send({"type": "move_needle", "position": position})
+                await asyncio.sleep(self.args.needle_interval)
+            self.guess = position
+            await self.send({"type": "submit_guess", "position": position})
+        except websockets.ConnectionClosed:
+            # El fallo ya lo registra play() al leer del socket cerrado
+            pass
+
+
+async def run_room(http_url: str, ws_url: str, metrics: Metrics, args):
+    request = urllib.request.Request(f"{http_url}/create-room", method="POST")
+    room_code = json.loads(await asyncio.to_thread(lambda: urllib.request.urlopen(request).read()))["room_code"]
+    bots = [Bot(ws_url, room_code, f"bot{i}", metrics, args) for i in range(args.players)]
+    # Todo, también la espera a que entren los jugadores, cuenta para el timeout
+    tasks = [asyncio.create_task(bot.play(args.players)) for bot in bots]
+    try:
+        await asyncio.wait_for(asyncio.gather(*tasks), args.timeout)
+    except Exception as e:
+        metrics.errors += 1
+        print(f"room {room_code} failed: {e!r}", file=sys.stderr)
+        for task in tasks:
+            task.cancel()
+
+
+def process_usage(pid: int) -> dict:
+    # CPU (s) y RSS (kB) del servidor y sus workers, leídos de /proc
+    pids = [pid]
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                        pids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                pass
+    cpu = 0.0
+    rss = 0
+    ticks = os.sysconf("SC_CLK_TCK")
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            cpu += (int(fields[11]) + int(fields[12])) / ticks
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        rss += int(line.split()[1])
+        except OSError:
+            pass
+    return {"cpu_s": cpu, "rss_kb": rss}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, tmp: str):
+    port = free_port()
+    env = {**os.environ, "HIGHSCORES_FILE": os.path.join(tmp, "highscores.json")}
+    if args.redis_url:
+        env.update(ROOM_BACKEND="redis", REDIS_URL=args.redis_url)
+    if args.workers > 1 and env.get("ROOM_BACKEND", "memory") != "redis":
+        sys.exit("--workers > 1 needs the redis backend: pass --redis-url or set ROOM_BACKEND=redis")
+    cmd = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"]
+    if args.workers > 1:
+        cmd += ["--workers", str(args.workers)]
+    server = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env)
+    url = f"http://127.0.0.1:{port}"
+    # Cada petición la atiende un worker cualquiera: se espera a una racha de
+    # respuestas listas para no empezar con alguno aún arrancando
+    streak = 0
+    for _ in range(300):
+        try:
+            urllib.request.urlopen(f"{url}/ready")
+            streak += 1
+            if streak >= 10 * args.workers:
+                return server, url
+            continue
+        except OSError:
+            streak = 0
+        time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("server did not start")
+
+
+async def run(http_url: str, args) -> dict:
+    ws_url = http_url.replace("http", "ws", 1)
+    metrics = Metrics()
+    start = time.perf_counter()
+    await asyncio.gather(*(run_room(http_url, ws_url, metrics, args) for _ in range(args.rooms)))
+    return metrics.summary(time.perf_counter() - start)
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    checks = [
+        ("p99 latency", result["latency_ms"]["all"]["p99"], baseline["latency_ms"]["all"]["p99"], True),
+        ("p50 latency", result["latency_ms"]["all"]["p50"], baseline["latency_ms"]["all"]["p50"], True),
+        ("msgs/s", result["msgs_per_s"], baseline["msgs_per_s"], False),
+    ]
+    if "cpu_s_per_room" in result and "cpu_s_per_room" in baseline:
+        checks.append(("cpu/room", result["cpu_s_per_room"], baseline["cpu_s_per_room"], True))
+        checks.append(("rss/room", result["rss_kb_per_room"], baseline["rss_kb_per_room"], True))
+    for name, value, base, lower_is_better in checks:
+        if not base:
+            continue
+        change = (value - base) / base
+        worse = change > tolerance if lower_is_better else -change > tolerance
+        print(f"  {name:>12}: {value:10.3f} vs {base:10.3f} ({change:+.1%}){'  REGRESSION' if worse else ''}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--players", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--games", type=int, default=1, help="games per room")
+    parser.add_argument("--needle-moves", type=int, default=10)
+    parser.add_argument("--needle-interval", type=float, default=0.02)
+    parser.add_argument("--think", type=float, default=0.05, help="max seconds before submitting a clue")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--redis-url", help="run the server with ROOM_BACKEND=redis against this Redis")
+    parser.add_argument("--proto", choices=["json", "compact"], default="json")
+    parser.add_argument("--url", help="target an already running server")
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        http_url = args.url
+        if not http_url:
+            server, http_url = start_server(args, tmp)
+        try:
+            before = process_usage(server.pid) if server else None
+            result = asyncio.run(run(http_url, args))
+            if server:
+                after = process_usage(server.pid)
+                result["cpu_s"] = round(after["cpu_s"] - before["cpu_s"], 3)
+                result["rss_kb"] = after["rss_kb"]
+                result["cpu_s_per_room"] = round(result["cpu_s"] / args.rooms, 5)
+                result["rss_kb_per_room"] = round((after["rss_kb"] - before["rss_kb"]) / args.rooms, 2)
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+
+    result["config"] = {k: v for k, v in vars(args).items() if k not in ("save_baseline", "compare", "url", "redis_url")}
+    result["config"]["backend"] = "redis" if args.redis_url or os.environ.get("ROOM_BACKEND") == "redis" else "memory"
+    result["config"]["cpus"] = os.cpu_count()
+    print(json.dumps(result, indent=2))
+
+    baselines = {}
+    if os.path.exists(BASELINES_FILE):
+        with open(BASELINES_FILE, "r", encoding="utf-8") as f:
+            baselines = json.load(f)
+    if args.save_baseline:
+        baselines[args.save_baseline] = result
+        with open(BASELINES_FILE, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2)
+            f.write("\n")
+    if args.compare:
+        if args.compare not in baselines:
+            sys.exit(f"no baseline named {args.compare!r} in {BASELINES_FILE}")
+        print(f"compared with baseline {args.compare!r}:")
+        if compare(result, baselines[args.compare], args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional, Union
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from metrics import BROADCAST_SECONDS, SEND_FAILURES
+from wire import PROTO_COMPACT, PROTO_JSON, compact_frame
+
+logger = logging.getLogger(__name__)
+
+# Mensajes pendientes por socket antes de considerarlo un consumidor lento
+SEND_QUEUE_SIZE = int(os.environ.get("SEND_QUEUE_SIZE", "64"))
+# Tiempo máximo que puede tardar un único envío antes de cortar la conexión
+SEND_TIMEOUT = float(os.environ.get("SEND_TIMEOUT", "5"))
+
+
+class RoomStats:
+    def __init__(self):
+        self.messages = 0
+        self.frames = 0
+        self.bytes = 0
+        self.dropped = 0
+        self.evicted = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.queue_depth_max = 0
+
+    def record_send(self, latency: float, size: int):
+        self.frames += 1
+        self.bytes += size
+        self.latency_total += latency
+        if latency > self.latency_max:
+            self.latency_max = latency
+
+    def as_dict(self, queue_depth: int) -> dict:
+        avg = self.latency_total / self.frames if self.frames else 0.0
+        return {
+            "messages": self.messages,
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "dropped": self.dropped,
+            "evicted": self.evicted,
+            "send_latency_avg_ms": round(avg * 1000, 3),
+            "send_latency_max_ms": round(self.latency_max * 1000, 3),
+            "queue_depth": queue_depth,
+            "queue_depth_max": self.queue_depth_max,
+        }
+
+
+class Connection:
+    def __init__(self, websocket: WebSocket, stats: RoomStats, max_queue: int = SEND_QUEUE_SIZE,
+                 proto: str = PROTO_JSON):
+        self.websocket = websocket
+        self.stats = stats
+        self.compact = proto == PROTO_COMPACT
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.closed = False
+        self.task = asyncio.create_task(self._writer())
+
+    def send(self, data: Union[str, bytes]) -> bool:
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait((data, time.perf_counter()))
+        except asyncio.QueueFull:
+            # El cliente no da abasto: se le expulsa en vez de frenar a la sala
+            self.stats.dropped += 1
+            self.stats.evicted += 1
+            SEND_FAILURES.inc("queue_full")
+            self.close()
+            return False
+        depth = self.queue.qsize()
+        if depth > self.stats.queue_depth_max:
+            self.stats.queue_depth_max = depth
+        return True
+
+    async def _writer(self):
+        try:
+            while True:
+                data, queued_at = await self.queue.get()
+                if data is None:
+                    self.closed = True
+                    await self._close_socket()
+                    return
+                if isinstance(data, bytes):
+                    await asyncio.wait_for(self.websocket.send_bytes(data), SEND_TIMEOUT)
+                else:
+                    await asyncio.wait_for(self.websocket.send_text(data), SEND_TIMEOUT)
+                self.stats.record_send(time.perf_counter() - queued_at, len(data))
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.info("send failed, closing socket: %r", e)
+            if isinstance(e, asyncio.TimeoutError):
+                SEND_FAILURES.inc("timeout")
+            elif isinstance(e, WebSocketDisconnect):
+                SEND_FAILURES.inc("disconnected")
+            else:
+                SEND_FAILURES.inc("error")
+            self.stats.dropped += 1
+            self.closed = True
+            await self._close_socket()
+
+    async def _close_socket(self):
+        try:
+            await self.websocket.close()
+        except Exception:
+            pass
+
+    def drain_and_close(self):
+        # Se envía lo que ya estaba en cola y después se cierra
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait((None, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.task.cancel()
+        asyncio.create_task(self._close_socket())
+
+
+class Broadcaster:
+    def __init__(self, max_queue: int = SEND_QUEUE_SIZE):
+        self.max_queue = max_queue
+        self.connections: Dict[str, Dict[str, Connection]] = {}
+        self.room_stats: Dict[str, RoomStats] = {}
+        # Sockets en modo compacto por sala: sin ellos no se genera el binario
+        self.compact_counts: Dict[str, int] = {}
+
+    def add(self, room_code: str, player_id: str, websocket: WebSocket, proto: str = PROTO_JSON) -> Connection:
+        stats = self.room_stats.setdefault(room_code, RoomStats())
+        conns = self.connections.setdefault(room_code, {})
+        old = conns.get(player_id)
+        if old:
+            old.close()
+            if old.compact:
+                self._count_compact(room_code, -1)
+        conn = Connection(websocket, stats, self.max_queue, proto)
+        conns[player_id] = conn
+        if conn.compact:
+            self._count_compact(room_code, 1)
+        return conn
+
+    def _count_compact(self, room_code: str, delta: int):
+        count = self.compact_counts.get(room_code, 0) + delta
+        if count:
+            self.compact_counts[room_code] = count
+        else:
+            self.compact_counts.pop(room_code, None)
+
+    def remove(self, room_code: str, player_id: str, conn: Optional[Connection] = None):
+        conns = self.connections.get(room_code)
+        if not conns or player_id not in conns:
+            return
+        # Si el jugador ya se reconectó, no borrar la conexión nueva
+        if conn is not None and conns[player_id] is not conn:
+            return
+        conn = conns.pop(player_id)
+        conn.close()
+        if conn.compact:
+            self._count_compact(room_code, -1)
+        if not conns:
+            del self.connections[room_code]
+
+    def close_room(self, room_code: str):
+        for conn in self.connections.pop(room_code, {}).values():
+            conn.drain_and_close()
+        self.room_stats.pop(room_code, None)
+        self.compact_counts.pop(room_code, None)
+
+    def send_text(self, room_code: str, player_id: str, text: str) -> bool:
+        conn = self.connections.get(room_code, {}).get(player_id)
+        if not conn:
+            return False
+        if conn.compact:
+            frame = compact_frame(text)
+            if frame is not None:
+                return conn.send(frame)
+        return conn.send(text)
+
+    def broadcast_text(self, room_code: str, text: str):
+        conns = self.connections.get(room_code)
+        if not conns:
+            return
+        start = time.perf_counter()
+        self.room_stats[room_code].messages += 1
+        # Se serializa una vez por formato, no una vez por socket
+        frame = compact_frame(text) if room_code in self.compact_counts else None
+        for conn in list(conns.values()):
+            conn.send(frame if frame is not None and conn.compact else text)
+        BROADCAST_SECONDS.observe(time.perf_counter() - start)
+
+    def stats(self, room_code: str) -> Optional[dict]:
+        stats = self.room_stats.get(room_code)
+        if stats is None:
+            return None
+        depth = sum(c.queue.qsize() for c in self.connections.get(room_code, {}).values())
+        return stats.as_dict(depth)
+
+    def socket_count(self) -> int:
+        return sum(len(conns) for conns in self.connections.values())
+
+    def all_stats(self) -> dict:
+        return {code: self.stats(code) for code in self.room_stats}
@@ -0,0 +1,128 @@
+import glob
+import json
+import logging
+import os
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DECKS_DIR = os.environ.get("DECKS_DIR", os.path.dirname(__file__))
+DEFAULT_DECK = "es"
+# adjectives.json es el mazo por defecto; adjectives.<nombre>.json añade otros
+DECK_PATTERN = "adjectives*.json"
+# Cada cuántos segundos se mira si el fichero ha cambiado
+RELOAD_CHECK = float(os.environ.get("DECK_RELOAD_CHECK", "5"))
+
+Pair = Tuple[str, str]
+
+
+def deck_name(path: str) -> str:
+    parts = os.path.basename(path).split(".")
+    return parts[1] if len(parts) == 3 else DEFAULT_DECK
+
+
+class Deck:
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.path = path
+        self.pairs: List[Pair] = []
+        self.mtime = 0.0
+        self.checked_at = 0.0
+        self.load()
+
+    def load(self):
+        mtime = os.path.getmtime(self.path)
+        with open(self.path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        pairs = []
+        seen = set()
+        for left, right in raw:
+            key = (left.strip().lower(), right.strip().lower())
+            if key in seen:
+                continue
+            seen.add(key)
+            pairs.append((left, right))
+        self.pairs = pairs
+        self.mtime = mtime
+        self.checked_at = time.monotonic()
+
+    def maybe_reload(self):
+        now = time.monotonic()
+        if now - self.checked_at < RELOAD_CHECK:
+            return
+        self.checked_at = now
+        try:
+            if os.path.getmtime(self.path) != self.mtime:
+                self.load()
+                logger.info("reloaded deck %s (%d pairs)", self.name, len(self.pairs))
+        except (OSError, ValueError) as e:
+            # Si el fichero está a medio escribir se sigue con el mazo anterior
+            logger.warning("could not reload deck %s: %r", self.name, e)
+
+    def sampler(self) -> "DeckSampler":
+        self.maybe_reload()
+        return DeckSampler(self.pairs)
+
+
+class DeckSampler:
+    # Fisher-Yates perezoso: cada carta cuesta O(1) sin copiar ni barajar el mazo
+    def __init__(self, pairs: List[Pair]):
+        self.pairs = pairs
+        self.swaps: Dict[int, int] = {}
+        self.remaining = len(pairs)
+
+    def draw(self) -> Optional[Pair]:
+        if not self.pairs:
+            return None
+        if self.remaining == 0:
+            # Mazo agotado: se vuelve a empezar, como antes con used_pairs
+            self.swaps.clear()
+            self.remaining = len(self.pairs)
+        i = random.randrange(self.remaining)
+        last = self.remaining - 1
+        picked = self.swaps.get(i, i)
+        self.swaps[i] = self.swaps.get(last, last)
+        self.swaps.pop(last, None)
+        self.remaining = last
+        return self.pairs[picked]
+
+
+class DeckRegistry:
+    def __init__(self, decks_dir: str = DECKS_DIR):
+        self.decks_dir = decks_dir
+        self.decks: Dict[str, Deck] = {}
+        self._paths: Dict[str, str] = {}
+        self._paths_at: Optional[float] = None
+
+    def paths(self) -> Dict[str, str]:
+        # El directorio se lista como mucho cada RELOAD_CHECK segundos, no en cada petición
+        now = time.monotonic()
+        if self._paths_at is None or now - self._paths_at >= RELOAD_CHECK:
+            self._paths = {deck_name(p): p for p in sorted(glob.glob(os.path.join(self.decks_dir, DECK_PATTERN)))}
+            self._paths_at = now
+        return self._paths
+
+    def warm(self):
+        for name, path in self.paths().items():
+            if name not in self.decks:
+                self.decks[name] = Deck(name, path)
+
+    def names(self) -> List[str]:
+        return sorted(self.paths())
+
+    def get(self, name: Optional[str] = None) -> Deck:
+        name = name or DEFAULT_DECK
+        deck = self.decks.get(name)
+        if deck is None:
+            path = self.paths().get(name)
+            if path is None:
+                if name == DEFAULT_DECK:
+                    raise FileNotFoundError(f"No deck file in {self.decks_dir}")
+                return self.get(DEFAULT_DECK)
+            deck = self.decks[name] = Deck(name, path)
+        return deck
+
+
+decks = DeckRegistry()
@@ -1,42 +1,19 @@
-import random
 import json
 import os
-from datetime import date
-from typing import Dict, List, Optional
-
-ADJECTIVES_FILE = os.path.join(os.path.dirname(__file__), "adjectives.json")
-HIGHSCORES_FILE = os.path.join(os.path.dirname(__file__), "highscores.json")
-
-def load_adjectives() -> List[List[str]]:
-    with open(ADJECTIVES_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def load_highscores() -> dict:
-    if not os.path.exists(HIGHSCORES_FILE):
-        return {}
-    with open(HIGHSCORES_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def save_highscores(data: dict):
-    with open(HIGHSCORES_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-def register_score(total_dials: int, score: int, player_names: List[str]) -> dict:
-    highscores = load_highscores()
-    key = str(total_dials)
-    if key not in highscores:
-        highscores[key] = []
-    highscores[key].append({
-        "score": score,
-        "players": player_names,
-        "date": date.today().isoformat(),
-    })
-    highscores[key].sort(key=lambda x: x["score"], reverse=True)
-    highscores[key] = highscores[key][:5]
-    save_highscores(highscores)
-    return highscores[key]
+import random
+from array import array
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+from decks import DEFAULT_DECK, decks
+from scoring import DEFAULT_RULES, RULE_SETS, TEAMS
+
+# Eventos que se guardan por sala para reenviar a quien se reconecta
+EVENT_LOG_SIZE = int(os.environ.get("EVENT_LOG_SIZE", "256"))
 
 class Clue:
+    __slots__ = ("target_position", "left_adjective", "right_adjective", "phrase", "submitted")
+
     def __init__(self, target_position: int, left_adjective: str = None, right_adjective: str = None):
         self.target_position = target_position
         self.left_adjective = left_adjective
@@ -45,23 +22,59 @@ class Clue:
         self.submitted = False
 
 class Player:
-    def __init__(self, player_id: str, name: str):
+    __slots__ = ("id", "name", "seat", "clues", "current_clue_index")
+
+    def __init__(self, player_id: str, name: str, seat: int = 0):
         self.id = player_id
         self.name = name
+        # Posición del jugador en los arrays de la sala
+        self.seat = seat
         self.clues: List[Clue] = []
         self.current_clue_index = 0
-        self.current_guess: Optional[int] = None
-        self.has_guessed = False
 
     def all_clues_submitted(self) -> bool:
-        return all(c.submitted for c in self.clues)
+        return self.current_clue_index >= len(self.clues)
 
     def current_clue(self) -> Optional[Clue]:
         if self.current_clue_index < len(self.clues):
             return self.clues[self.current_clue_index]
         return None
 
+    def to_state(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "seat": self.seat,
+            "clue_index": self.current_clue_index,
+            "clues": [
+                [c.target_position, c.left_adjective, c.right_adjective, c.phrase, c.submitted]
+                for c in self.clues
+            ],
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "Player":
+        player = cls(state["id"], state["name"], state["seat"])
+        player.current_clue_index = state["clue_index"]
+        for target, left, right, phrase, submitted in state["clues"]:
+            clue = Clue(target, left, right)
+            clue.phrase = phrase
+            clue.submitted = submitted
+            player.clues.append(clue)
+        return player
+
+NO_GUESS = -1
+
 class GameRoom:
+    __slots__ = (
+        "room_code", "players", "host_id", "state", "num_rounds", "mode", "deck", "public",
+        "guessing_order", "targets", "current_guess_index", "last_needle_position", "team_score",
+        "rules", "scores", "dial_log", "reveal", "phase", "version", "events", "last_players",
+        "connected", "departed",
+        "guesses", "ready", "active", "free_seats",
+        "ready_total", "ready_count", "guesser_count", "pending_clues",
+    )
+
     def __init__(self, room_code: str):
         self.room_code = room_code
         self.players: Dict[str, Player] = {}
@@ -69,13 +82,47 @@ class GameRoom:
         self.state = "waiting"
         self.num_rounds = 3
         self.mode = "free"
+        self.deck = DEFAULT_DECK
+        # Las públicas aparecen en el lobby y se puede entrar sin el código
+        self.public = False
         self.guessing_order: List[tuple] = []
+        self.targets = array("h")
         self.current_guess_index: int = 0
         self.last_needle_position: int = 90
         self.team_score: int = 0
+        self.rules = RULE_SETS[DEFAULT_RULES]
+        # Puntos acumulados por jugador o equipo según las reglas de la partida
+        self.scores: Dict[str, int] = {}
+        # Lo necesario para volver a puntuar la partida con otras reglas
+        self.dial_log: List[dict] = []
+        self.reveal: Optional[dict] = None
+        # Cambia en cada fase (escritura, pista, revelación): los plazos
+        # programados para una fase anterior se ignoran
+        self.phase = 0
+        self.version = 0
+        # El log se crea con el primer evento: las salas vacías no lo pagan
+        self.events: Optional[deque] = None
+        self.last_players: Optional[list] = None
+        # Ids con socket abierto (pueden no haber hecho join todavía)
+        self.connected: Set[str] = set()
+        # Jugadores que se fueron a mitad de partida: sus pistas siguen en juego
+        self.departed: Dict[str, Player] = {}
+        # Estado de adivinanza por asiento, en arrays compactos
+        self.guesses = array("h")
+        self.ready = bytearray()
+        self.active = bytearray()
+        self.free_seats: List[int] = []
+        # Contadores incrementales: las comprobaciones de "listos" son O(1)
+        self.ready_total = 0
+        self.ready_count = 0
+        self.guesser_count = 0
+        self.pending_clues = 0
 
     @property
     def total_dials(self) -> int:
+        # Ya repartidas, cuentan todas: también las de quien se fue a mitad
+        if self.guessing_order:
+            return len(self.guessing_order)
         return self.num_rounds * len(self.players)
 
     @property
@@ -90,57 +137,221 @@ class GameRoom:
             return self.guessing_order[self.current_guess_index][1]
         return None
 
+    def _take_seat(self) -> int:
+        if self.free_seats:
+            return self.free_seats.pop()
+        self.guesses.append(NO_GUESS)
+        self.ready.append(0)
+        self.active.append(0)
+        return len(self.guesses) - 1
+
     def add_player(self, player_id: str, name: str) -> Player:
-        player = Player(player_id, name)
+        # Quien se fue a mitad de partida vuelve con sus pistas, y con su
+        # asiento (y su equipo) si nadie lo ha ocupado mientras tanto
+        player = self.departed.pop(player_id, None)
+        if player is None:
+            player = Player(player_id, name, self._take_seat())
+        elif player.seat in self.free_seats:
+            self.free_seats.remove(player.seat)
+        else:
+            player.seat = self._take_seat()
+        player.name = name
         self.players[player_id] = player
         if self.host_id is None:
             self.host_id = player_id
+        if player_id in self.connected:
+            self._set_active(player, True)
         return player
 
     def remove_player(self, player_id: str):
-        if player_id in self.players:
+        player = self.players.get(player_id)
+        if player:
+            self._set_ready(player, False)
+            self._set_active(player, False)
+            self.guesses[player.seat] = NO_GUESS
+            self.free_seats.append(player.seat)
+            if self.state == "writing":
+                self.pending_clues -= len(player.clues) - player.current_clue_index
+            elif self.state == "guessing":
+                self.departed[player_id] = player
             del self.players[player_id]
         if self.host_id == player_id and self.players:
             self.host_id = next(iter(self.players))
 
+    def set_connected(self, player_id: str, connected: bool):
+        if connected:
+            self.connected.add(player_id)
+        else:
+            self.connected.discard(player_id)
+        player = self.players.get(player_id)
+        if player:
+            self._set_active(player, connected)
+
+    def is_connected(self, player_id: str) -> bool:
+        return player_id in self.connected
+
+    def _set_active(self, player: Player, value: bool):
+        if self.active[player.seat] == value:
+            return
+        self.active[player.seat] = value
+        if player.id != self.current_clue_owner_id:
+            delta = 1 if value else -1
+            self.guesser_count += delta
+            if self.ready[player.seat]:
+                self.ready_count += delta
+
+    def _set_ready(self, player: Player, value: bool):
+        if self.ready[player.seat] == value:
+            return
+        self.ready[player.seat] = value
+        delta = 1 if value else -1
+        self.ready_total += delta
+        if self.active[player.seat] and player.id != self.current_clue_owner_id:
+            self.ready_count += delta
+
+    def _recount(self):
+        # Solo al cambiar de pista: el dueño deja de contar como adivinador
+        owner_id = self.current_clue_owner_id
+        self.guesser_count = 0
+        self.ready_count = 0
+        for pid, p in self.players.items():
+            if pid != owner_id and self.active[p.seat]:
+                self.guesser_count += 1
+                self.ready_count += self.ready[p.seat]
+
+    def ready_counts(self):
+        return self.ready_count, self.guesser_count
+
+    def all_active_guessed(self) -> bool:
+        return self.guesser_count > 0 and self.ready_count == self.guesser_count
+
+    def ready_players(self) -> List[str]:
+        return [pid for pid, p in self.players.items() if self.ready[p.seat]]
+
+    def record_event(self, message: dict) -> str:
+        self.version += 1
+        message["v"] = self.version
+        text = json.dumps(message)
+        if self.events is None:
+            self.events = deque(maxlen=EVENT_LOG_SIZE)
+        self.events.append((self.version, text))
+        return text
+
+    def events_since(self, version: int) -> Optional[List[str]]:
+        if version > self.version:
+            return None
+        if version == self.version:
+            return []
+        # Si el log ya no llega tan atrás hace falta un snapshot completo
+        if not self.events or self.events[0][0] > version + 1:
+            return None
+        return [text for v, text in self.events if v > version]
+
+    def to_state(self) -> dict:
+        # Lo necesario para rehacer la sala tras un reinicio; conexiones, log de
+        # eventos y plazos no se guardan. Se copia todo: el dict sale del bucle
+        return {
+            "room_code": self.room_code,
+            "host_id": self.host_id,
+            "state": self.state,
+            "num_rounds": self.num_rounds,
+            "mode": self.mode,
+            "deck": self.deck,
+            "public": self.public,
+            "players": [p.to_state() for p in self.players.values()],
+            "departed": [p.to_state() for p in self.departed.values()],
+            "guessing_order": [list(entry) for entry in self.guessing_order],
+            "targets": self.targets.tolist(),
+            "current_guess_index": self.current_guess_index,
+            "last_needle_position": self.last_needle_position,
+            "team_score": self.team_score,
+            "rules": self.rules.name,
+            "scores": dict(self.scores),
+            "dial_log": list(self.dial_log),
+            "reveal": dict(self.reveal) if self.reveal else None,
+            "version": self.version,
+            "guesses": self.guesses.tolist(),
+            "ready": list(self.ready),
+            "free_seats": list(self.free_seats),
+            "pending_clues": self.pending_clues,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "GameRoom":
+        room = cls(state["room_code"])
+        room.host_id = state["host_id"]
+        room.state = state["state"]
+        room.num_rounds = state["num_rounds"]
+        room.mode = state["mode"]
+        room.deck = state["deck"]
+        room.public = state.get("public", False)
+        room.players = {p["id"]: Player.from_state(p) for p in state["players"]}
+        room.departed = {p["id"]: Player.from_state(p) for p in state["departed"]}
+        room.guessing_order = [tuple(entry) for entry in state["guessing_order"]]
+        room.targets = array("h", state["targets"])
+        room.current_guess_index = state["current_guess_index"]
+        room.last_needle_position = state["last_needle_position"]
+        room.team_score = state["team_score"]
+        room.rules = RULE_SETS[state["rules"]]
+        room.scores = state["scores"]
+        room.dial_log = state["dial_log"]
+        room.reveal = state["reveal"]
+        room.version = state["version"]
+        room.guesses = array("h", state["guesses"])
+        room.ready = bytearray(state["ready"])
+        # Nadie está conectado hasta que vuelva a abrir su socket
+        room.active = bytearray(len(room.guesses))
+        room.free_seats = state["free_seats"]
+        room.ready_total = sum(room.ready)
+        room.pending_clues = state["pending_clues"]
+        room._recount()
+        return room
+
+    def team_of(self, player: Player) -> int:
+        return player.seat % 2
+
     def get_player_list(self):
+        if self.rules.name == "teams":
+            return [{"id": p.id, "name": p.name, "team": TEAMS[self.team_of(p)]} for p in self.players.values()]
         return [{"id": p.id, "name": p.name} for p in self.players.values()]
 
-    def start_round(self, num_rounds: int = 3, mode: str = "free"):
+    def start_round(self, num_rounds: int = 3, mode: str = "free", deck: Optional[str] = None,
+                    scoring: str = DEFAULT_RULES):
         self.state = "writing"
         self.num_rounds = num_rounds
         self.mode = mode
+        self.deck = deck or DEFAULT_DECK
         self.guessing_order = []
         self.current_guess_index = 0
         self.last_needle_position = 90
         self.team_score = 0
+        self.rules = RULE_SETS[scoring]
+        self.scores = {}
+        self.dial_log = []
+        self.reveal = None
+        self.phase += 1
+        self.departed = {}
 
-        adjectives = load_adjectives() if mode == "battery" else []
-        used_pairs = []
+        sampler = decks.get(self.deck).sampler() if mode == "battery" else None
 
+        self._reset_guesses()
+        self.pending_clues = num_rounds * len(self.players)
         for player in self.players.values():
             player.clues = []
             player.current_clue_index = 0
-            player.current_guess = None
-            player.has_guessed = False
             for _ in range(num_rounds):
                 # Rango ampliado para que el 4 pueda estar en los extremos
                 position = random.randint(5, 175)
-                if mode == "battery" and adjectives:
-                    available = [p for p in adjectives if p not in used_pairs]
-                    if not available:
-                        available = adjectives
-                        used_pairs = []
-                    pair = random.choice(available)
-                    used_pairs.append(pair)
+                pair = sampler.draw() if sampler else None
+                if pair:
                     clue = Clue(position, pair[0], pair[1])
                 else:
                     clue = Clue(position)
                 player.clues.append(clue)
 
-    def submit_clue(self, player_id: str, phrase: str, left_adj: str = None, right_adj: str = None):
+    def submit_clue(self, player_id: str, phrase: str, left_adj: str = None, right_adj: str = None) -> Optional[Clue]:
         if player_id not in self.players:
-            return
+            return None
         player = self.players[player_id]
         clue = player.current_clue()
         if clue and not clue.submitted:
@@ -151,9 +362,18 @@ class GameRoom:
                 clue.right_adjective = right_adj
             clue.submitted = True
             player.current_clue_index += 1
+            self.pending_clues -= 1
+            return clue
+        return None
 
     def all_submitted_clues(self) -> bool:
-        return all(p.all_clues_submitted() for p in self.players.values())
+        return self.pending_clues <= 0
+
+    def fill_missing_clues(self, phrase: str):
+        # Se acabó el tiempo de escribir: las pistas que faltan se dan por enviadas
+        for pid, player in self.players.items():
+            while not player.all_clues_submitted():
+                self.submit_clue(pid, phrase)
 
     def start_guessing_phase(self):
         self.state = "guessing"
@@ -163,49 +383,90 @@ class GameRoom:
                 all_clues.append((pid, i))
         random.shuffle(all_clues)
         self.guessing_order = all_clues
+        self.targets = array("h", (self.players[pid].clues[i].target_position for pid, i in all_clues))
         self.current_guess_index = 0
         self.last_needle_position = 90
+        self.reveal = None
+        self.phase += 1
         self._reset_guesses()
 
     def _reset_guesses(self):
-        for p in self.players.values():
-            p.current_guess = None
-            p.has_guessed = False
+        n = len(self.guesses)
+        self.guesses = array("h", [NO_GUESS]) * n
+        self.ready = bytearray(n)
+        self.ready_total = 0
+        self._recount()
 
     def submit_guess(self, player_id: str, position: int):
         owner_id = self.current_clue_owner_id
-        if player_id != owner_id and player_id in self.players:
-            self.players[player_id].current_guess = position
-            self.players[player_id].has_guessed = True
+        player = self.players.get(player_id)
+        if player_id != owner_id and player:
+            self.guesses[player.seat] = position
+            self._set_ready(player, True)
+
+    def cancel_guess(self, player_id: str):
+        player = self.players.get(player_id)
+        if player:
+            self._set_ready(player, False)
+
+    def clear_ready(self):
+        # Al mover la aguja todos dejan de estar listos; sin listos no hay nada que hacer
+        if self.ready_total == 0:
+            return
+        self.ready = bytearray(len(self.ready))
+        self.ready_total = 0
+        self.ready_count = 0
 
-    def all_guessed_current(self) -> bool:
+    def fill_missing_guesses(self, position: int):
+        # Se acabó el tiempo de adivinar: quien no confirmó se queda donde esté la aguja
         owner_id = self.current_clue_owner_id
-        return all(p.has_guessed for pid, p in self.players.items() if pid != owner_id)
+        for pid, player in self.players.items():
+            if pid != owner_id and not self.ready[player.seat]:
+                self.guesses[player.seat] = position
+
+    def reveal_current(self) -> dict:
+        points, breakdown = self.calculate_points_current()
+        self.reveal = {
+            "target_position": self.targets[self.current_guess_index],
+            "needle_position": self.last_needle_position,
+            "points_this_dial": points,
+        }
+        if breakdown:
+            self.reveal["breakdown"] = breakdown
+            self.reveal["scores"] = dict(self.scores)
+        self.phase += 1
+        return self.reveal
 
-    def calculate_points_current(self) -> int:
+    def calculate_points_current(self) -> Tuple[int, Dict[str, int]]:
         owner_id = self.current_clue_owner_id
         clue_index = self.current_clue_owner_clue_index
         if not owner_id or clue_index is None:
-            return 0
-        target = self.players[owner_id].clues[clue_index].target_position
+            return 0, {}
+        target = self.targets[self.current_guess_index]
+        owner = self.players.get(owner_id) or self.departed[owner_id]
+        owner_team = self.team_of(owner)
         guesses = [
-            p.current_guess for pid, p in self.players.items()
-            if pid != owner_id and p.current_guess is not None
+            (pid, self.team_of(p), self.guesses[p.seat]) for pid, p in self.players.items()
+            if pid != owner_id and self.guesses[p.seat] != NO_GUESS
         ]
+        self.dial_log.append({
+            "target": target,
+            "owner_team": owner_team,
+            "guesses": [[team, position] for _, team, position in guesses],
+        })
         if not guesses:
-            return 0
-        avg_guess = sum(guesses) / len(guesses)
-        diff = abs(avg_guess - target)
-        if diff <= 5: points = 4
-        elif diff <= 11: points = 3
-        elif diff <= 19: points = 2
-        else: points = 0
+            return 0, {}
+        points, breakdown = self.rules.score(target, guesses, owner_team)
         self.team_score += points
-        return points
+        for key, value in breakdown.items():
+            self.scores[key] = self.scores.get(key, 0) + value
+        return points, breakdown
 
     def next_clue(self) -> bool:
         self.current_guess_index += 1
         self.last_needle_position = 90
+        self.reveal = None
+        self.phase += 1
         self._reset_guesses()
         if self.current_guess_index >= len(self.guessing_order):
             self.state = "finished"
@@ -217,7 +478,7 @@ class GameRoom:
         clue_index = self.current_clue_owner_clue_index
         if not owner_id or clue_index is None:
             return None
-        owner = self.players[owner_id]
+        owner = self.players.get(owner_id) or self.departed[owner_id]
         clue = owner.clues[clue_index]
         return {
             "owner_id": owner_id,
@@ -245,16 +506,3 @@ class GameRoom:
             "mode": self.mode,
         }
 
-
-rooms: Dict[str, GameRoom] = {}
-
-def create_room() -> GameRoom:
-    code = str(random.randint(1000, 9999))
-    while code in rooms:
-        code = str(random.randint(1000, 9999))
-    room = GameRoom(code)
-    rooms[code] = room
-    return room
-
-def get_room(code: str) -> Optional[GameRoom]:
-    return rooms.get(code)
\ No newline at end of file
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import date
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+HIGHSCORES_FILE = os.environ.get(
+    "HIGHSCORES_FILE", os.path.join(os.path.dirname(__file__), "highscores.json")
+)
+TOP_N = 5
+# Segundos que se agrupan las partidas terminadas antes de escribir a disco
+FLUSH_DELAY = float(os.environ.get("HIGHSCORES_FLUSH_DELAY", "2"))
+
+
+def merge_scores(ours: Dict[str, List[dict]], theirs: Dict[str, List[dict]], top_n: int) -> Dict[str, List[dict]]:
+    # Une dos tablas sin repetir entradas; a igualdad de puntos van antes las nuestras
+    merged = {}
+    for key in ours.keys() | theirs.keys():
+        seen = set()
+        entries = []
+        for entry in ours.get(key, []) + theirs.get(key, []):
+            ident = (entry["score"], tuple(entry["players"]), entry["date"])
+            if ident not in seen:
+                seen.add(ident)
+                entries.append(entry)
+        entries.sort(key=lambda e: -e["score"])
+        merged[key] = entries[:top_n]
+    return merged
+
+
+def atomic_write(path: str, text: str):
+    # Se escribe a un temporal y se renombra: el fichero nunca queda a medias.
+    # Un temporal por proceso: varios workers pueden guardar a la vez
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# Con varios workers cada uno tiene su tabla en memoria: al guardar se mezcla
+# con lo que haya en el fichero para no pisar las partidas de los demás. Dos
+# guardados exactamente a la vez pueden perder las entradas nuevas de uno en
+# el fichero, pero siguen en su memoria y vuelven a salir en su próximo flush
+class Leaderboard:
+    def __init__(self, path: str = HIGHSCORES_FILE, top_n: int = TOP_N, flush_delay: float = FLUSH_DELAY):
+        self.path = path
+        self.top_n = top_n
+        self.flush_delay = flush_delay
+        self.scores: Dict[str, List[dict]] = {}
+        self.loaded = False
+        self.dirty = False
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    def _read(self) -> Dict[str, List[dict]]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {key: entries[:self.top_n] for key, entries in data.items()}
+
+    def load(self):
+        self.scores = self._read()
+        self.loaded = True
+
+    def top(self, total_dials: int) -> List[dict]:
+        return self.scores.get(str(total_dials), [])
+
+    def all(self) -> Dict[str, List[dict]]:
+        return self.scores
+
+    def register(self, total_dials: int, score: int, player_names: List[str]) -> List[dict]:
+        entries = self.scores.setdefault(str(total_dials), [])
+        # La lista ya está ordenada: basta con buscar el hueco
+        pos = next((i for i, e in enumerate(entries) if e["score"] < score), len(entries))
+        if pos < self.top_n:
+            entries.insert(pos, {
+                "score": score,
+                "players": player_names,
+                "date": date.today().isoformat(),
+            })
+            del entries[self.top_n:]
+            self.dirty = True
+            self._schedule_flush()
+        return entries
+
+    def _schedule_flush(self):
+        if self._flush_handle is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._flush_handle = loop.call_later(self.flush_delay, self._start_flush)
+
+    def _start_flush(self):
+        # Se guarda la tarea: que no la recoja el GC a medias y close() pueda esperarla
+        self._flush_task = asyncio.create_task(self.flush())
+
+    def _merge_and_write(self, scores: Dict[str, List[dict]]) -> Dict[str, List[dict]]:
+        merged = merge_scores(scores, self._read(), self.top_n)
+        atomic_write(self.path, json.dumps(merged, ensure_ascii=False, indent=2))
+        return merged
+
+    async def flush(self):
+        self._flush_handle = None
+        async with self._flush_lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+            snapshot = {key: list(entries) for key, entries in self.scores.items()}
+            try:
+                merged = await asyncio.to_thread(self._merge_and_write, snapshot)
+            except (OSError, ValueError) as e:
+                logger.error("could not save highscores: %r", e)
+                self.dirty = True
+                return
+            # Lo de otros workers entra también en esta tabla; lo registrado
+            # mientras se escribía se conserva y sale en el siguiente flush
+            self.scores = merge_scores(self.scores, merged, self.top_n)
+
+    async def close(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        if self._flush_task is not None:
+            await self._flush_task
+        await self.flush()
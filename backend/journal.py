@@ -0,0 +1,274 @@
+import asyncio
+import gc
+import glob
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Set
+
+from game import GameRoom
+from highscores import atomic_write
+from metrics import JOURNAL_ENTRIES, JOURNAL_FSYNC_SECONDS
+from store import WORKER_ID
+
+logger = logging.getLogger(__name__)
+
+# Directorio del journal; vacío = las salas solo viven en memoria
+JOURNAL_DIR = os.environ.get("JOURNAL_DIR", "")
+# Segundos que se agrupan las entradas antes de escribirlas con un único fsync
+JOURNAL_FLUSH_INTERVAL = float(os.environ.get("JOURNAL_FLUSH_INTERVAL", "0.05"))
+# Se compacta (snapshot + segmento nuevo) al pasar de tantas entradas o de
+# tantos segundos: acota lo que hay que reproducir al arrancar
+JOURNAL_COMPACT_ENTRIES = int(os.environ.get("JOURNAL_COMPACT_ENTRIES", "50000"))
+JOURNAL_COMPACT_INTERVAL = float(os.environ.get("JOURNAL_COMPACT_INTERVAL", "300"))
+# Deltas de una sala antes de volver a guardar su estado completo
+JOURNAL_TAIL_LIMIT = int(os.environ.get("JOURNAL_TAIL_LIMIT", "64"))
+
+SNAPSHOT_FILE = "snapshot.jsonl"
+
+
+def entry_key(line: str):
+    # Las líneas son ["op","código",...]: op y código salen sin parsear el JSON
+    _, op, _, code, _ = line.split('"', 4)
+    return op, code
+
+
+def apply_entry(room: GameRoom, entry: list):
+    op = entry[0]
+    if op == "clue":
+        room.submit_clue(*entry[2:])
+    elif op == "guess":
+        room.submit_guess(*entry[2:])
+    elif op == "cancel":
+        room.cancel_guess(*entry[2:])
+    elif op == "needle":
+        room.last_needle_position = entry[2]
+        room.clear_ready()
+
+
+# Journal de las salas de este worker. Los cambios frecuentes (pistas,
+# adivinanzas) se guardan como deltas y el resto como el estado completo de la
+# sala. Las entradas se encolan desde el bucle y una tarea las escribe por
+# lotes con un solo fsync. De cada sala se conserva en memoria su último
+# estado ya serializado y los deltas posteriores: compactar es volcar eso a un
+# snapshot y empezar un segmento nuevo, sin volver a serializar ninguna sala
+class Journal:
+    def __init__(self, directory: str = JOURNAL_DIR, flush_interval: float = JOURNAL_FLUSH_INTERVAL,
+                 compact_entries: int = JOURNAL_COMPACT_ENTRIES,
+                 compact_interval: float = JOURNAL_COMPACT_INTERVAL, tail_limit: int = JOURNAL_TAIL_LIMIT):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.compact_entries = compact_entries
+        self.compact_interval = compact_interval
+        self.tail_limit = tail_limit
+        self.tails: Dict[str, List[str]] = {}
+        self.segment = 0
+        self.file = None
+        self.buffer: List[str] = []
+        self.since_compact = 0
+        self.compacted_at = time.monotonic()
+        self.wakeup = asyncio.Event()
+        self.closing = False
+        self.task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.batches = 0
+        self.restored = 0
+        self.restore_seconds = 0.0
+        # Identidades anteriores de este worker que aparecen en el journal
+        self.previous_owners: Set[str] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def _append(self, line: str, op: str):
+        self.buffer.append(line)
+        JOURNAL_ENTRIES.inc(op)
+        self.wakeup.set()
+
+    def record(self, room: GameRoom, op: str, *args):
+        if not self.enabled:
+            return
+        tail = self.tails.get(room.room_code)
+        if tail is None or len(tail) > self.tail_limit:
+            self.save(room)
+            return
+        line = json.dumps([op, room.room_code, *args], separators=(",", ":"))
+        tail.append(line)
+        self._append(line, op)
+
+    def save(self, room: GameRoom):
+        if not self.enabled:
+            return
+        line = json.dumps(["room", room.room_code, room.to_state()], separators=(",", ":"))
+        self.tails[room.room_code] = [line]
+        self._append(line, "room")
+
+    def drop(self, code: str):
+        if self.enabled and self.tails.pop(code, None) is not None:
+            self._append(json.dumps(["drop", code]), "drop")
+
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"journal-{segment:08d}.log")
+
+    def _segments(self) -> List[int]:
+        names = glob.glob(os.path.join(self.directory, "journal-*.log"))
+        return sorted(int(os.path.basename(name)[8:-4]) for name in names)
+
+    def _read(self, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    # Solo la última línea puede quedar a medias tras un corte
+                    logger.warning("truncated journal entry in %s", path)
+                    return
+                line = line[:-1]
+                if not line.startswith("["):
+                    continue
+                op, code = entry_key(line)
+                if op == "worker":
+                    self.previous_owners.add(json.loads(line)[2])
+                elif op == "room":
+                    self.tails[code] = [line]
+                elif op == "drop":
+                    self.tails.pop(code, None)
+                elif code in self.tails:
+                    self.tails[code].append(line)
+
+    def restore(self) -> Dict[str, GameRoom]:
+        # Bloqueante: se llama en un hilo antes de aceptar conexiones. Primero
+        # se agrupan las líneas por sala y solo se parsea el último estado de
+        # cada una con sus deltas; lo que quedó superado ni se decodifica
+        if not self.enabled:
+            return {}
+        start = time.perf_counter()
+        os.makedirs(self.directory, exist_ok=True)
+        # Se crean muchos objetos de golpe y ninguno es basura: sin el GC
+        # recorriéndolos una y otra vez la restauración tarda la mitad
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            rooms = self._restore()
+        finally:
+            if gc_enabled:
+                gc.enable()
+        self.restored = len(rooms)
+        self.restore_seconds = time.perf_counter() - start
+        logger.info("restored %d rooms from journal in %.2fs", len(rooms), self.restore_seconds)
+        return rooms
+
+    def _restore(self) -> Dict[str, GameRoom]:
+        first = 0
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+            first = header["segment"]
+            self.previous_owners.add(header["worker"])
+            self._read(path)
+        segments = [n for n in self._segments() if n >= first]
+        for n in segments:
+            self._read(self._path(n))
+        rooms: Dict[str, GameRoom] = {}
+        for code, tail in list(self.tails.items()):
+            try:
+                room = GameRoom.from_state(json.loads(tail[0])[2])
+                for line in tail[1:]:
+                    apply_entry(room, json.loads(line))
+            except Exception:
+                # Una sala ilegible no debe impedir que arranquen las demás
+                logger.exception("could not restore room %s", code)
+                del self.tails[code]
+                continue
+            rooms[code] = room
+        self.segment = max(segments + [first - 1]) + 1
+        return rooms
+
+    def start(self):
+        if self.enabled:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.closing = True
+        self.wakeup.set()
+        await self.task
+        self.task = None
+        # Al cerrar limpio se deja un snapshot: el siguiente arranque no reproduce nada
+        await self.compact()
+
+    async def run(self):
+        while not self.closing:
+            await self.wakeup.wait()
+            # Se espera un poco para que el fsync cubra un lote de entradas
+            await asyncio.sleep(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                await self.flush()
+                if self.since_compact >= self.compact_entries or \
+                        time.monotonic() - self.compacted_at >= self.compact_interval:
+                    await self.compact()
+            except OSError as e:
+                logger.error("journal write failed: %r", e)
+
+    async def flush(self):
+        lines, self.buffer = self.buffer, []
+        if not lines:
+            return
+        try:
+            await asyncio.to_thread(self._write, self.segment, lines)
+        except OSError:
+            # Se reintenta en el siguiente lote, sin perder el orden
+            self.buffer = lines + self.buffer
+            raise
+        self.since_compact += len(lines)
+
+    def _write(self, segment: int, lines: List[str]):
+        start = time.perf_counter()
+        if self.file is None:
+            self.file = open(self._path(segment), "a", encoding="utf-8")
+            # Cada segmento empieza diciendo de qué worker es
+            self.file.write(json.dumps(["worker", "", WORKER_ID]) + "\n")
+        self.file.write("\n".join(lines) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.written += len(lines)
+        self.batches += 1
+        JOURNAL_FSYNC_SECONDS.observe(time.perf_counter() - start)
+
+    async def compact(self):
+        # Las colas de las salas y el buffer se toman a la vez, sin await de por
+        # medio: lo anterior va al segmento viejo y al snapshot, lo posterior al nuevo
+        tails = [line for tail in self.tails.values() for line in tail]
+        lines, self.buffer = self.buffer, []
+        old, self.segment = self.segment, self.segment + 1
+        self.since_compact = 0
+        self.compacted_at = time.monotonic()
+        await asyncio.to_thread(self._write_snapshot, old, lines, tails)
+
+    def _write_snapshot(self, old: int, lines: List[str], tails: List[str]):
+        if lines:
+            self._write(old, lines)
+        if self.file:
+            self.file.close()
+            self.file = None
+        header = json.dumps({"segment": old + 1, "worker": WORKER_ID})
+        atomic_write(os.path.join(self.directory, SNAPSHOT_FILE), "\n".join([header, *tails]) + "\n")
+        # Con el snapshot ya en disco los segmentos anteriores sobran
+        for n in self._segments():
+            if n <= old:
+                os.remove(self._path(n))
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "rooms": len(self.tails),
+            "segment": self.segment,
+            "pending": len(self.buffer),
+            "written": self.written,
+            "batches": self.batches,
+            "restored": self.restored,
+            "restore_seconds": round(self.restore_seconds, 3),
+        }
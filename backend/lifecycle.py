@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable
+
+from game import GameRoom
+from store import RoomStore
+
+logger = logging.getLogger(__name__)
+
+# Segundos sin actividad ni jugadores conectados antes de borrar una sala
+ROOM_IDLE_TTL = float(os.environ.get("ROOM_IDLE_TTL", "900"))
+# Segundos que se conserva una partida terminada sin actividad
+ROOM_FINISHED_TTL = float(os.environ.get("ROOM_FINISHED_TTL", "300"))
+# Máximo de salas vivas; al llegar se expulsa la más inactiva
+MAX_ROOMS = int(os.environ.get("MAX_ROOMS", "5000"))
+REAP_INTERVAL = float(os.environ.get("REAP_INTERVAL", "30"))
+
+
+class RoomLifecycle:
+    def __init__(self, store: RoomStore, is_connected: Callable[[str], bool],
+                 on_evict: Callable[[str], Awaitable[None]],
+                 idle_ttl: float = ROOM_IDLE_TTL, finished_ttl: float = ROOM_FINISHED_TTL,
+                 max_rooms: int = MAX_ROOMS, interval: float = REAP_INTERVAL):
+        self.store = store
+        self.is_connected = is_connected
+        self.on_evict = on_evict
+        self.idle_ttl = idle_ttl
+        self.finished_ttl = finished_ttl
+        self.max_rooms = max_rooms
+        self.interval = interval
+        self.created = 0
+        self.evicted = 0
+        self.peak = 0
+        self.task = None
+
+    async def create(self) -> GameRoom:
+        while len(self.store) >= self.max_rooms:
+            oldest = next(iter(self.store.oldest()), None)
+            if oldest is None:
+                break
+            logger.info("room cap reached, evicting %s", oldest)
+            await self.evict(oldest)
+        room = await self.store.create()
+        self.created += 1
+        self.peak = max(self.peak, len(self.store))
+        return room
+
+    async def evict(self, code: str):
+        await self.on_evict(code)
+        await self.store.remove(code)
+        self.evicted += 1
+
+    def expired(self, code: str, idle: float) -> bool:
+        room = self.store.get(code)
+        if room is None:
+            return True
+        if room.state == "finished" and idle >= self.finished_ttl:
+            return True
+        return idle >= self.idle_ttl and not self.is_connected(code)
+
+    async def reap(self):
+        min_ttl = min(self.idle_ttl, self.finished_ttl)
+        candidates = []
+        # Las salas están ordenadas por actividad: al llegar a una reciente se para
+        for code in self.store.oldest():
+            idle = self.store.idle_for(code)
+            if idle < min_ttl:
+                break
+            if self.expired(code, idle):
+                candidates.append(code)
+        for code in candidates:
+            await self.evict(code)
+        if candidates:
+            logger.info("reaped %d rooms, %d live", len(candidates), len(self.store))
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.reap()
+            except Exception:
+                logger.exception("room reaper failed")
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "live": len(self.store),
+            "created": self.created,
+            "evicted": self.evicted,
+            "peak": self.peak,
+        }
@@ -0,0 +1,211 @@
+import asyncio
+import bisect
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from game import GameRoom
+from messages import MAX_ROUNDS
+from store import KEY_PREFIX, RedisRoomStore, RoomStore, room_key
+
+logger = logging.getLogger(__name__)
+
+# Plazas de una sala pública: el índice solo ofrece las que tienen hueco
+PUBLIC_ROOM_SEATS = int(os.environ.get("PUBLIC_ROOM_SEATS", "8"))
+LOBBY_PAGE_SIZE = int(os.environ.get("LOBBY_PAGE_SIZE", "20"))
+LOBBY_PAGE_MAX = 100
+# Estados en los que se puede entrar a una sala y empezar partida
+LISTED_STATES = ("waiting", "finished")
+
+# (modo, rondas, plazas libres, código): ordenadas así, las salas de un mismo
+# modo y rondas quedan juntas y primero las más llenas, que antes empezarán
+Key = Tuple[str, int, int, str]
+
+
+def listing_key(room: GameRoom, seats: int) -> Optional[Key]:
+    if not room.public or room.state not in LISTED_STATES:
+        return None
+    free = seats - len(room.players)
+    if free <= 0:
+        return None
+    return room.mode, room.num_rounds, free, room.room_code
+
+
+def encode_cursor(key: Key) -> str:
+    return "{}.{}.{}.{}".format(*key)
+
+
+def decode_cursor(cursor: str) -> Key:
+    mode, num_rounds, free, code = cursor.split(".")
+    return mode, int(num_rounds), int(free), code
+
+
+# Índice de las salas públicas con hueco. Se actualiza tras cada mensaje que
+# procesa una sala (update no hace nada si su clave no ha cambiado) y se
+# consulta sin recorrer las salas: emparejar es una búsqueda binaria por modo
+# y rondas, y cada página sigue a partir de la clave del cursor
+class LobbyIndex:
+    def __init__(self, seats: int = PUBLIC_ROOM_SEATS):
+        self.seats = seats
+        self.entries: Dict[str, Key] = {}
+        self.keys: List[Key] = []
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def update(self, room: GameRoom):
+        key = listing_key(room, self.seats)
+        old = self.entries.get(room.room_code)
+        if key == old:
+            return
+        if old is not None:
+            self._discard(old)
+        if key is None:
+            self.entries.pop(room.room_code, None)
+        else:
+            self.entries[room.room_code] = key
+            self._add(key)
+
+    def remove(self, code: str):
+        old = self.entries.pop(code, None)
+        if old is not None:
+            self._discard(old)
+
+    def _add(self, key: Key):
+        bisect.insort(self.keys, key)
+
+    def _discard(self, key: Key):
+        i = bisect.bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            del self.keys[i]
+
+    def _bounds(self, mode: Optional[str], num_rounds: Optional[int]) -> Tuple[int, int]:
+        if mode is None:
+            return 0, len(self.keys)
+        if num_rounds is None:
+            return bisect.bisect_left(self.keys, (mode,)), bisect.bisect_left(self.keys, (mode, MAX_ROUNDS + 1))
+        return (bisect.bisect_left(self.keys, (mode, num_rounds)),
+                bisect.bisect_left(self.keys, (mode, num_rounds + 1)))
+
+    async def quick_join(self, mode: str, num_rounds: Optional[int] = None) -> Optional[str]:
+        # La sala más llena del modo; sin rondas indicadas, de cualquiera de ellas
+        best = None
+        for rounds in ([num_rounds] if num_rounds else range(1, MAX_ROUNDS + 1)):
+            lo, hi = self._bounds(mode, rounds)
+            if lo < hi and (best is None or self.keys[lo][2] < best[2]):
+                best = self.keys[lo]
+        return best[3] if best else None
+
+    async def page(self, mode: Optional[str] = None, num_rounds: Optional[int] = None,
+                   cursor: Optional[Key] = None, limit: int = LOBBY_PAGE_SIZE) -> Tuple[List[Key], Optional[Key]]:
+        lo, hi = self._bounds(mode, num_rounds)
+        if cursor is not None:
+            lo = max(lo, bisect.bisect_right(self.keys, cursor))
+        keys = self.keys[lo:min(hi, lo + limit)]
+        more = lo + limit < hi
+        return keys, keys[-1] if more and keys else None
+
+    def describe(self, key: Key) -> dict:
+        mode, num_rounds, free, code = key
+        return {"room_code": code, "mode": mode, "num_rounds": num_rounds,
+                "players": self.seats - free, "free_seats": free}
+
+
+# Con varios workers el índice es un sorted set de Redis con todas las claves
+# a puntuación 0: ZRANGEBYLEX hace la misma búsqueda por prefijo. Cada worker
+# solo escribe las claves de sus salas, en orden y fuera del bucle de la sala
+class RedisLobbyIndex(LobbyIndex):
+    def __init__(self, store: RedisRoomStore, seats: int = PUBLIC_ROOM_SEATS):
+        super().__init__(seats)
+        self.store = store
+        self.client = store.client
+        self.key = f"{KEY_PREFIX}:lobby"
+        self.outbox: asyncio.Queue = asyncio.Queue()
+        self.task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def member(key: Key) -> str:
+        # Números con ceros a la izquierda: el orden lexicográfico es el numérico
+        mode, num_rounds, free, code = key
+        return f"{mode}|{num_rounds:02d}|{free:02d}|{code}"
+
+    @staticmethod
+    def parse(member: bytes) -> Key:
+        mode, num_rounds, free, code = member.decode().split("|")
+        return mode, int(num_rounds), int(free), code
+
+    def start(self):
+        self.task = asyncio.create_task(self._writer())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+
+    async def _writer(self):
+        while True:
+            op, member = await self.outbox.get()
+            try:
+                if op == "add":
+                    await self.client.zadd(self.key, {member: 0})
+                else:
+                    await self.client.zrem(self.key, member)
+            except Exception as e:
+                logger.warning("lobby index update failed: %r", e)
+
+    def _add(self, key: Key):
+        self.outbox.put_nowait(("add", self.member(key)))
+
+    def _discard(self, key: Key):
+        self.outbox.put_nowait(("rem", self.member(key)))
+
+    def _range(self, mode: Optional[str], num_rounds: Optional[int]) -> Tuple[str, str]:
+        if mode is None:
+            return "-", "+"
+        prefix = f"{mode}|" if num_rounds is None else f"{mode}|{num_rounds:02d}|"
+        return f"[{prefix}", f"[{prefix}\xff"
+
+    async def _live(self, keys: List[Key]) -> List[Key]:
+        # Un worker caído deja sus claves en el índice: se quitan al encontrarlas
+        if not keys:
+            return keys
+        owners = [owner and owner.decode() for owner in await self.client.mget([room_key(key[3]) for key in keys])]
+        alive = await self.store.alive(owner for owner in owners if owner)
+        live = [owner in alive for owner in owners]
+        stale = [self.member(key) for key, ok in zip(keys, live) if not ok]
+        if stale:
+            await self.client.zrem(self.key, *stale)
+        return [key for key, ok in zip(keys, live) if ok]
+
+    async def quick_join(self, mode: str, num_rounds: Optional[int] = None) -> Optional[str]:
+        pipe = self.client.pipeline()
+        for rounds in ([num_rounds] if num_rounds else range(1, MAX_ROUNDS + 1)):
+            low, high = self._range(mode, rounds)
+            pipe.zrangebylex(self.key, low, high, start=0, num=4)
+        candidates = [self.parse(m) for found in await pipe.execute() for m in found]
+        live = await self._live(sorted(candidates, key=lambda key: key[2]))
+        return live[0][3] if live else None
+
+    async def page(self, mode=None, num_rounds=None, cursor=None, limit=LOBBY_PAGE_SIZE):
+        low, high = self._range(mode, num_rounds)
+        if cursor is not None:
+            member = self.member(cursor)
+            if low == "-" or member >= low[1:]:
+                low = f"({member}"
+        found = await self.client.zrangebylex(self.key, low, high, start=0, num=limit + 1)
+        keys = [self.parse(m) for m in found]
+        more = len(keys) > limit
+        keys = keys[:limit]
+        last = keys[-1] if more and keys else None
+        return await self._live(keys), last
+
+
+def make_lobby(store: RoomStore) -> LobbyIndex:
+    if isinstance(store, RedisRoomStore):
+        return RedisLobbyIndex(store)
+    return LobbyIndex()
@@ -1,9 +1,63 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import FastAPI, HTTPException, Query, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import ValidationError
+import asyncio
+import itertools
 import json
-from game import create_room, get_room, register_score, load_highscores
+import logging
+import os
+from broadcaster import Broadcaster
+from needle import NeedleChannel
+from spectators import SpectatorFeed
+from lobby import LOBBY_PAGE_MAX, LOBBY_PAGE_SIZE, decode_cursor, encode_cursor, make_lobby
+from highscores import Leaderboard
+from decks import decks
+from store import WORKER_ID, make_backend
+from lifecycle import RoomLifecycle
+from wire import PROTO_JSON, PROTOCOLS
+from metrics import (
+    MESSAGES_REJECTED, PROFILE_TOKEN, LoopLagMonitor, profiler, registry, timed_handler,
+)
+from game import GameRoom
+from messages import (
+    MAX_ROUNDS, RATES, CancelGuess, Connect, Disconnect, Expire, Join, LobbySettings, Message, Mode, MoveNeedle,
+    NextClue, PhaseTimeout, StartRound, SubmitClue, SubmitGuess, Watch, parse_client, parse_command,
+)
+from ratelimit import RateLimiter
+from actors import RoomActors
+from scheduler import DeadlineScheduler
+from scoring import DEFAULT_RULES, GAME_RECORDS_FILE, append_record
+from journal import Journal
+from startup import Warmup
+from analytics import Analytics
+
+logger = logging.getLogger(__name__)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    lifecycle.start()
+    lobby.start()
+    loop_lag.start()
+    # uvicorn no abre el puerto hasta que esto cede: lo lento va en segundo plano
+    warmup.start()
+    yield
+    await warmup.stop()
+    await loop_lag.stop()
+    profiler.stop()
+    await lifecycle.stop()
+    await lobby.stop()
+    deadlines.stop()
+    actors.stop_all()
+    await journal.stop()
+    await analytics.stop()
+    await bus.stop()
+    await store.stop()
+    await leaderboard.close()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,15 +67,138 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-connections: dict = {}
+store, bus = make_backend()
+lobby = make_lobby(store)
+broadcaster = Broadcaster()
+spectators = SpectatorFeed()
+spectator_ids = itertools.count(1)
+leaderboard = Leaderboard()
+# Sockets conectados a este worker
+connections = broadcaster.connections
+# Segundos que se guarda el sitio a un jugador desconectado
+RECONNECT_GRACE = float(os.environ.get("RECONNECT_GRACE", "30"))
+# Tras un reinicio los jugadores tardan más en volver: todos reconectan a la vez
+RESTORE_GRACE = float(os.environ.get("JOURNAL_RESTORE_GRACE", "120"))
+pending_removals: Dict[Tuple[str, str], asyncio.TimerHandle] = {}
+# Socket vigente de cada jugador: el cierre de uno ya sustituido no lo desconecta
+sessions: Dict[Tuple[str, str], str] = {}
+connection_ids = itertools.count(1)
+# Mensajes de un socket pendientes de procesar antes de empezar a descartar
+INBOUND_QUEUE_SIZE = int(os.environ.get("INBOUND_QUEUE_SIZE", "32"))
+loop_lag = LoopLagMonitor()
+# Límites de tiempo por fase en segundos (0 = sin límite)
+WRITING_TIME_LIMIT = float(os.environ.get("WRITING_TIME_LIMIT", "300"))
+GUESSING_TIME_LIMIT = float(os.environ.get("GUESSING_TIME_LIMIT", "120"))
+# Tras revelar una pista se pasa sola a la siguiente pasado este tiempo
+REVEAL_AUTO_ADVANCE = float(os.environ.get("REVEAL_AUTO_ADVANCE", "30"))
+# Frase para las pistas que no se escribieron a tiempo
+TIMEOUT_PHRASE = "(sin pista)"
+PHASE_LIMITS = {"writing": WRITING_TIME_LIMIT, "guessing": GUESSING_TIME_LIMIT, "reveal": REVEAL_AUTO_ADVANCE}
+deadlines = DeadlineScheduler()
+
+def get_room(room_code: str):
+    return store.get(room_code)
+
+def deliver(room_code: str, player_id: Optional[str], text: str):
+    if player_id is None:
+        broadcaster.broadcast_text(room_code, text)
+        spectators.publish(room_code, text)
+    elif not broadcaster.send_text(room_code, player_id, text):
+        spectators.send_text(room_code, player_id, text)
+
+def watched(room_code: str) -> bool:
+    # Este worker recibe los eventos de la sala mientras tenga jugadores o público
+    return room_code in connections or room_code in spectators
+
+def on_command(room_code: str, player_id: str, message: dict):
+    try:
+        command = parse_command(message)
+    except ValidationError as e:
+        logger.warning("bad command for room %s: %r", room_code, e)
+        return
+    enqueue_command(room_code, player_id, command)
+
+def enqueue_command(room_code: str, player_id: str, command: Message):
+    if actors.send_nowait(room_code, player_id, command) or not get_room(room_code):
+        return
+    if command.type.startswith("_"):
+        # Conexiones, expiraciones y plazos no se pueden perder: con la sala
+        # saturada se reintenta en un momento, igual que phase_expired
+        asyncio.get_running_loop().call_later(1, enqueue_command, room_code, player_id, command)
+    else:
+        logger.warning("room %s inbox full, dropped %s from %s", room_code, command.type, player_id)
+
+def send_to(room_code: str, player_id: str, message: dict):
+    bus.publish(room_code, json.dumps(message), player_id)
 
 async def broadcast(room_code: str, message: dict):
-    if room_code in connections:
-        for ws in connections[room_code].values():
-            try:
-                await ws.send_text(json.dumps(message))
-            except:
-                pass
+    needle.before_broadcast(room_code, message)
+    room = get_room(room_code)
+    if not room:
+        return
+    # La lista de jugadores solo viaja cuando cambia; game_state siempre la lleva
+    if "players" in message:
+        if message["type"] != "game_state" and message["players"] == room.last_players:
+            del message["players"]
+        else:
+            room.last_players = message["players"]
+    bus.publish(room_code, room.record_event(message))
+
+def room_snapshot(room, room_code: str, player_id: str) -> dict:
+    ready_count, total_guessers = room.ready_counts()
+    snapshot = {
+        "type": "snapshot",
+        "v": room.version,
+        "state": room.state,
+        "players": room.get_player_list(),
+        "host_id": room.host_id,
+        "mode": room.mode,
+        "num_rounds": room.num_rounds,
+        "public": room.public,
+        "scoring": room.rules.name,
+        "team_score": room.team_score,
+        "scores": room.scores,
+        "needle_position": room.last_needle_position,
+        "ready_count": ready_count,
+        "total_guessers": total_guessers,
+        "ready_players": room.ready_players(),
+        "deadline": deadlines.deadline(room_code, "phase"),
+    }
+    if room.state == "writing":
+        snapshot.update(room.get_player_writing_state(player_id) or {})
+    elif room.state == "guessing":
+        snapshot["clue"] = room.get_current_clue_info()
+        if room.reveal:
+            snapshot.update(room.reveal)
+    elif room.state == "finished":
+        snapshot["total_dials"] = room.total_dials
+        snapshot["leaderboard"] = leaderboard.top(room.total_dials)
+    return snapshot
+
+def resume(room, room_code: str, player_id: str, last_seen_version: int):
+    missed = room.events_since(last_seen_version)
+    # El estado de escritura es privado y no está en el log
+    if missed is None or (missed and room.state == "writing"):
+        send_to(room_code, player_id, room_snapshot(room, room_code, player_id))
+        return
+    for text in missed:
+        bus.publish(room_code, text, player_id)
+    send_to(room_code, player_id, {
+        "type": "resumed",
+        "v": room.version,
+        "needle_position": room.last_needle_position,
+    })
+
+def schedule_removal(room_code: str, player_id: str, delay: float = RECONNECT_GRACE):
+    loop = asyncio.get_running_loop()
+    pending_removals[(room_code, player_id)] = loop.call_later(
+        delay, on_command, room_code, player_id, {"type": "_expire"},
+    )
+
+def cancel_removal(room_code: str, player_id: str):
+    handle = pending_removals.pop((room_code, player_id), None)
+    if handle:
+        handle.cancel()
 
 async def send_game_state(room_code: str):
     room = get_room(room_code)
@@ -34,209 +211,611 @@ async def send_game_state(room_code: str):
         "host_id": room.host_id,
     })
 
-def all_active_guessed(room, room_code):
-    owner_id = room.current_clue_owner_id
-    active_pids = set(connections.get(room_code, {}).keys())
-    guessers = [pid for pid in active_pids if pid in room.players and pid != owner_id]
-    if not guessers:
-        return False
-    return all(room.players[pid].has_guessed for pid in guessers)
-
-def count_active_guessers(room, room_code):
-    owner_id = room.current_clue_owner_id
-    active_pids = set(connections.get(room_code, {}).keys())
-    total = sum(1 for pid in active_pids if pid in room.players and pid != owner_id)
-    ready = sum(1 for pid in active_pids if pid in room.players and pid != owner_id and room.players[pid].has_guessed)
-    return ready, total
+def schedule_phase(room: GameRoom, room_code: str, kind: str) -> Optional[float]:
+    # Cada sala tiene un único plazo, el de la fase en curso
+    limit = PHASE_LIMITS[kind]
+    if limit <= 0:
+        deadlines.cancel(room_code, "phase")
+        return None
+    # La fase se fija ahora: si el plazo vence ya en otra, se ignora
+    phase = room.phase
+    deadlines.schedule(room_code, "phase", limit, lambda: phase_expired(room_code, phase))
+    return deadlines.deadline(room_code, "phase")
+
+def phase_expired(room_code: str, phase: int):
+    if not actors.send_nowait(room_code, "", PhaseTimeout(phase=phase)) and get_room(room_code):
+        # Sala saturada: se reintenta en un momento en vez de dejarla colgada
+        deadlines.schedule(room_code, "phase", 1, lambda: phase_expired(room_code, phase))
+
+async def begin_guessing(room: GameRoom, room_code: str):
+    room.start_guessing_phase()
+    # El plazo va antes que nada que pueda fallar: sin él la sala se queda colgada
+    deadline = schedule_phase(room, room_code, "guessing")
+    journal.save(room)
+    await broadcast(room_code, {
+        "type": "guessing_started",
+        "state": room.state,
+        "clue": room.get_current_clue_info(),
+        "players": room.get_player_list(),
+        "needle_position": room.last_needle_position,
+        "host_id": room.host_id,
+        "deadline": deadline,
+    })
+
+async def reveal_clue(room: GameRoom, room_code: str):
+    reveal = room.reveal_current()
+    deadline = schedule_phase(room, room_code, "reveal")
+    journal.save(room)
+    analytics.record_dial(room, reveal["points_this_dial"])
+    await broadcast(room_code, {
+        "type": "clue_reveal",
+        **reveal,
+        "team_score": room.team_score,
+        "clue": room.get_current_clue_info(),
+        "players": room.get_player_list(),
+        "host_id": room.host_id,
+        "deadline": deadline,
+    })
+
+async def maybe_reveal(room: GameRoom, room_code: str):
+    # Un "listo" que llega tarde (pista ya revelada o partida terminada) no vuelve a revelar
+    if room.state == "guessing" and room.reveal is None and room.all_active_guessed():
+        await reveal_clue(room, room_code)
+
+async def resume_after_leave(room: GameRoom, room_code: str):
+    # Si solo faltaba quien se ha ido, la fase se cierra ya sin esperar al plazo
+    if room.state == "writing" and room.players and room.all_submitted_clues():
+        await begin_guessing(room, room_code)
+    else:
+        await maybe_reveal(room, room_code)
+
+async def advance_clue(room: GameRoom, room_code: str):
+    more = room.next_clue()
+    deadline = schedule_phase(room, room_code, "guessing") if more else None
+    journal.save(room)
+    if more:
+        await broadcast(room_code, {
+            "type": "guessing_started",
+            "state": room.state,
+            "clue": room.get_current_clue_info(),
+            "players": room.get_player_list(),
+            "needle_position": room.last_needle_position,
+            "host_id": room.host_id,
+            "deadline": deadline,
+        })
+        return
+    deadlines.cancel(room_code)
+    total_dials = room.total_dials
+    # Una partida que se queda sin jugadores no entra en la tabla, y solo el
+    # modo cooperativo es comparable con lo que ya hay en ella
+    if room.players and room.rules.name == DEFAULT_RULES:
+        top = leaderboard.register(total_dials, room.team_score, [p.name for p in room.players.values()])
+    else:
+        top = leaderboard.top(total_dials)
+    await broadcast(room_code, {
+        "type": "game_finished",
+        "state": room.state,
+        "players": room.get_player_list(),
+        "team_score": room.team_score,
+        "scores": room.scores,
+        "total_dials": total_dials,
+        "leaderboard": top,
+        "host_id": room.host_id,
+    })
+    if GAME_RECORDS_FILE and room.dial_log:
+        record = {"scoring": room.rules.name, "team_score": room.team_score, "dials": room.dial_log}
+        try:
+            await asyncio.to_thread(append_record, GAME_RECORDS_FILE, record)
+        except OSError as e:
+            logger.error("could not record game: %r", e)
+
+def room_ready_counts(room_code: str):
+    room = get_room(room_code)
+    if not room:
+        return 0, 0
+    return room.ready_counts()
+
+def connected_count(room_code: str) -> int:
+    room = get_room(room_code)
+    return len(room.connected) if room else 0
+
+async def evict_room(room_code: str):
+    actors.stop(room_code)
+    deadlines.cancel(room_code)
+    journal.drop(room_code)
+    lobby.remove(room_code)
+    room = get_room(room_code)
+    if room:
+        await broadcast(room_code, {"type": "room_closed"})
+    needle.discard(room_code)
+    for key in [key for key in pending_removals if key[0] == room_code]:
+        pending_removals.pop(key).cancel()
+    for key in [key for key in sessions if key[0] == room_code]:
+        del sessions[key]
+    if watched(room_code):
+        await bus.unwatch(room_code)
+    broadcaster.close_room(room_code)
+    spectators.close_room(room_code)
+
+registry.gauge("wavelength_rooms", "Live rooms owned by this worker", lambda: len(store))
+registry.gauge("wavelength_players", "Players in live rooms of this worker",
+               lambda: sum(len(room.players) for room in map(get_room, store.codes()) if room))
+registry.gauge("wavelength_sockets", "Open websockets on this worker", broadcaster.socket_count)
+registry.gauge("wavelength_public_rooms", "Public rooms of this worker listed in the lobby", lambda: len(lobby))
+registry.gauge("wavelength_spectators", "Spectator websockets on this worker", spectators.socket_count)
+registry.gauge("wavelength_event_loop_lag_max_seconds", "Worst event loop lag seen", lambda: loop_lag.max)
+
+lifecycle = RoomLifecycle(store, lambda room_code: connected_count(room_code) > 0, evict_room)
+
+journal = Journal()
+analytics = Analytics()
+
+async def restore_rooms():
+    rooms = await asyncio.to_thread(journal.restore)
+    adopted = await store.adopt(rooms, journal.previous_owners)
+    # Las que ya tiene otro worker dejan de ser de este journal
+    for room_code in rooms.keys() - {room.room_code for room in adopted}:
+        journal.drop(room_code)
+    for room in adopted:
+        room_code = room.room_code
+        lobby.update(room)
+        # Quien no vuelva a conectarse sale de la sala como con cualquier desconexión
+        for player_id in room.players:
+            schedule_removal(room_code, player_id, RESTORE_GRACE)
+        # Los plazos no se guardan: la fase en curso vuelve a empezar a contar
+        if room.state == "writing":
+            schedule_phase(room, room_code, "writing")
+        elif room.state == "guessing":
+            schedule_phase(room, room_code, "reveal" if room.reveal else "guessing")
+    journal.start()
+
+warmup = Warmup([
+    ("store", store.start),
+    ("leaderboard", lambda: asyncio.to_thread(leaderboard.load)),
+    ("decks", lambda: asyncio.to_thread(decks.warm)),
+    ("bus", lambda: bus.start(deliver, on_command)),
+    ("journal", restore_rooms),
+    ("analytics", analytics.start),
+])
+registry.gauge("wavelength_ready", "1 once the warm-up has finished", lambda: int(warmup.ready))
+registry.gauge("wavelength_warmup_seconds", "Seconds the warm-up took", lambda: warmup.seconds)
+
+async def require_ready():
+    # Salas, mazos y récords no se sirven a medio cargar
+    if not await warmup.wait():
+        raise HTTPException(status_code=503, detail="Starting up")
+
+needle = NeedleChannel(bus.publish, room_ready_counts, connected_count)
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready():
+    return JSONResponse(warmup.report(), status_code=200 if warmup.ready else 503)
+
+async def open_room(public: bool, mode: str, num_rounds: int) -> GameRoom:
+    room = await lifecycle.create()
+    room.public = public
+    room.mode = mode
+    room.num_rounds = num_rounds
+    journal.save(room)
+    lobby.update(room)
+    return room
 
 @app.post("/create-room")
-async def create_room_endpoint():
-    room = create_room()
+async def create_room_endpoint(public: bool = False, mode: Mode = "free",
+                               num_rounds: int = Query(3, ge=1, le=MAX_ROUNDS)):
+    await require_ready()
+    room = await open_room(public, mode, num_rounds)
     return {"room_code": room.room_code}
 
+@app.get("/lobby")
+async def list_lobby(mode: Optional[Mode] = None, num_rounds: Optional[int] = Query(None, ge=1, le=MAX_ROUNDS),
+                     cursor: Optional[str] = None, limit: int = Query(LOBBY_PAGE_SIZE, ge=1, le=LOBBY_PAGE_MAX)):
+    await require_ready()
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Bad cursor")
+    keys, last = await lobby.page(mode, num_rounds, after, limit)
+    return {"rooms": [lobby.describe(key) for key in keys], "next": encode_cursor(last) if last else None}
+
+@app.post("/quick-join")
+async def quick_join(mode: Mode = "free", num_rounds: Optional[int] = Query(None, ge=1, le=MAX_ROUNDS)):
+    # La sala pública más llena que encaje; si no hay ninguna se abre una
+    await require_ready()
+    room_code = await lobby.quick_join(mode, num_rounds)
+    if room_code:
+        return {"room_code": room_code, "created": False}
+    room = await open_room(True, mode, num_rounds or 3)
+    return {"room_code": room.room_code, "created": True}
+
 @app.get("/room/{room_code}")
 async def check_room(room_code: str):
+    await require_ready()
     room = get_room(room_code)
     if not room:
-        return {"exists": False}
+        return {"exists": await store.owner_of(room_code) is not None}
     return {"exists": True, "players": room.get_player_list(), "state": room.state}
 
+@app.get("/decks")
+async def get_decks():
+    await require_ready()
+    return {"decks": decks.names()}
+
+@app.get("/stats")
+async def get_stats():
+    return {
+        "rooms": lifecycle.stats(),
+        "broadcast": broadcaster.all_stats(),
+        "needle": needle.all_stats(),
+        "spectators": spectators.all_stats(),
+        "lobby": {"listed": len(lobby)},
+        "analytics": analytics.stats(),
+        "actors": actors.stats(),
+        "deadlines": deadlines.stats(),
+        "journal": journal.stats(),
+    }
+
+@app.get("/analytics")
+async def get_analytics(deck: Optional[str] = None, min_dials: int = Query(1, ge=1),
+                        limit: int = Query(50, ge=1, le=500)):
+    if not analytics.enabled:
+        raise HTTPException(status_code=404, detail="Analytics disabled")
+    await require_ready()
+    # Solo lee los agregados, y desde un hilo: no compite con las salas
+    return await asyncio.to_thread(analytics.report, deck, min_dials, limit)
+
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+def check_profile_token(token: str):
+    # Sin PROFILE_TOKEN configurado el profiler no se expone
+    if not PROFILE_TOKEN or token != PROFILE_TOKEN:
+        raise HTTPException(status_code=404)
+
+@app.post("/debug/profile")
+async def start_profile(token: str = "", seconds: float = 30):
+    check_profile_token(token)
+    if not profiler.start(min(max(seconds, 1), 600)):
+        raise HTTPException(status_code=409, detail="Profiler not available in this process")
+    return profiler.report()
+
+@app.get("/debug/profile")
+async def get_profile(token: str = "", top: int = 30):
+    check_profile_token(token)
+    return profiler.report(top)
+
 @app.get("/highscores")
 async def get_highscores():
-    return load_highscores()
+    await require_ready()
+    return leaderboard.all()
+
+Handler = Callable[[GameRoom, str, str, Message], Awaitable[None]]
+HANDLERS: Dict[str, Handler] = {}
+
+def handles(msg_type: str):
+    def register(func: Handler) -> Handler:
+        HANDLERS[msg_type] = func
+        return func
+    return register
+
+async def handle_message(room_code: str, player_id: str, message: Message):
+    handler = HANDLERS.get(message.type)
+    room = get_room(room_code)
+    if handler is None or not room:
+        return
+    store.touch(room_code)
+    with timed_handler(message.type):
+        await handler(room, room_code, player_id, message)
+    # Jugadores, estado y ajustes solo cambian en los handlers
+    lobby.update(room)
+
+@handles("_connect")
+async def on_connect(room: GameRoom, room_code: str, player_id: str, message: Connect):
+    cancel_removal(room_code, player_id)
+    sessions[(room_code, player_id)] = message.conn
+    room.set_connected(player_id, True)
+    last_seen_version = message.last_seen_version
+    if last_seen_version is not None and player_id in room.players:
+        resume(room, room_code, player_id, last_seen_version)
+    await send_game_state(room_code)
+
+@handles("_watch")
+async def on_watch(room: GameRoom, room_code: str, player_id: str, message: Watch):
+    # Solo la parte pública: sin el estado de escritura de ningún jugador.
+    # Los eventos del siguiente lote con v <= al del snapshot ya están en él
+    send_to(room_code, player_id, room_snapshot(room, room_code, ""))
+
+@handles("_disconnect")
+async def on_disconnect(room: GameRoom, room_code: str, player_id: str, message: Disconnect):
+    # El jugador ya volvió con otro socket y este _disconnect llega detrás de su _connect
+    if sessions.get((room_code, player_id)) != message.conn:
+        return
+    del sessions[(room_code, player_id)]
+    room.set_connected(player_id, False)
+    if RECONNECT_GRACE > 0 and player_id in room.players:
+        schedule_removal(room_code, player_id)
+        await broadcast(room_code, {"type": "player_disconnected", "player_id": player_id})
+    else:
+        room.remove_player(player_id)
+        journal.save(room)
+        await broadcast(room_code, {"type": "player_left", "player_id": player_id})
+        await send_game_state(room_code)
+    await resume_after_leave(room, room_code)
+
+@handles("_expire")
+async def on_expire(room: GameRoom, room_code: str, player_id: str, message: Expire):
+    pending_removals.pop((room_code, player_id), None)
+    if not room.is_connected(player_id):
+        room.remove_player(player_id)
+        journal.save(room)
+        await broadcast(room_code, {"type": "player_left", "player_id": player_id})
+        await send_game_state(room_code)
+        await resume_after_leave(room, room_code)
+
+@handles("join")
+async def on_join(room: GameRoom, room_code: str, player_id: str, message: Join):
+    name = message.name
+    if player_id not in room.players and room.public and len(room.players) >= lobby.seats:
+        send_to(room_code, player_id, {"type": "error", "message": "Sala llena"})
+        return
+    if player_id not in room.players:
+        room.add_player(player_id, name)
+        journal.save(room)
+        await broadcast(room_code, {"type": "player_joined", "name": name})
+    await send_game_state(room_code)
+
+@handles("lobby_settings")
+async def on_lobby_settings(room: GameRoom, room_code: str, player_id: str, message: LobbySettings):
+    if player_id == room.host_id:
+        # Se guardan para el lobby público; start_round los vuelve a fijar y
+        # a media partida o tras ella no se tocan (total_dials depende de ellos)
+        if room.state == "waiting":
+            room.num_rounds = message.num_rounds
+            room.mode = message.mode
+        if message.public is not None:
+            room.public = message.public
+        journal.save(room)
+        await broadcast(room_code, {
+            "type": "lobby_settings",
+            "num_rounds": message.num_rounds,
+            "mode": message.mode,
+            "scoring": message.scoring,
+            "deck": message.deck,
+            "public": room.public,
+        })
+
+@handles("start_round")
+async def on_start_round(room: GameRoom, room_code: str, player_id: str, message: StartRound):
+    if player_id == room.host_id and len(room.players) >= 2 and room.state in ["waiting", "finished"]:
+        num_rounds = message.num_rounds
+        mode = message.mode
+        room.start_round(num_rounds, mode, message.deck, message.scoring)
+        journal.save(room)
+        deadline = schedule_phase(room, room_code, "writing")
+        for pid in list(room.connected):
+            if pid in room.players:
+                writing_state = room.get_player_writing_state(pid)
+                if writing_state:
+                    send_to(room_code, pid, {
+                        "type": "round_started",
+                        "state": room.state,
+                        "players": room.get_player_list(),
+                        "host_id": room.host_id,
+                        "deadline": deadline,
+                        **writing_state,
+                    })
+
+@handles("submit_clue")
+async def on_submit_clue(room: GameRoom, room_code: str, player_id: str, message: SubmitClue):
+    clue = room.submit_clue(
+        player_id,
+        message.phrase,
+        message.left_adjective,
+        message.right_adjective,
+    )
+    if clue:
+        analytics.record_clue(room, clue)
+    journal.record(room, "clue", player_id, message.phrase, message.left_adjective, message.right_adjective)
+    player = room.players.get(player_id)
+    if player and not player.all_clues_submitted():
+        writing_state = room.get_player_writing_state(player_id)
+        if writing_state:
+            send_to(room_code, player_id, {
+                "type": "next_writing",
+                "state": room.state,
+                "deadline": deadlines.deadline(room_code, "phase"),
+                **writing_state,
+            })
+        await broadcast(room_code, {"type": "writing_progress", "players": room.get_player_list()})
+    elif room.all_submitted_clues():
+        await begin_guessing(room, room_code)
+    else:
+        await broadcast(room_code, {"type": "writing_progress", "players": room.get_player_list()})
+
+@handles("move_needle")
+async def on_move_needle(room: GameRoom, room_code: str, player_id: str, message: MoveNeedle):
+    position = message.position
+    # Solo interesa cuando borra "listos"; el resto de movimientos no se guarda.
+    # Se apunta ya aplicado: si toca guardar la sala entera, va con la aguja nueva
+    clears = bool(room.ready_total)
+    room.last_needle_position = position
+    room.clear_ready()
+    if clears:
+        journal.record(room, "needle", position)
+    needle.update(room_code, position, player_id)
+
+@handles("cancel_guess")
+async def on_cancel_guess(room: GameRoom, room_code: str, player_id: str, message: CancelGuess):
+    room.cancel_guess(player_id)
+    journal.record(room, "cancel", player_id)
+    ready_count, total_guessers = room.ready_counts()
+    await broadcast(room_code, {
+        "type": "player_ready",
+        "player_id": player_id,
+        "is_ready": False,          # ← nuevo campo
+        "ready_count": ready_count,
+        "total_guessers": total_guessers,
+        "players": room.get_player_list(),
+    })
+
+@handles("submit_guess")
+async def on_submit_guess(room: GameRoom, room_code: str, player_id: str, message: SubmitGuess):
+    position = message.position
+    room.submit_guess(player_id, position)
+    journal.record(room, "guess", player_id, position)
+    ready_count, total_guessers = room.ready_counts()
+    await broadcast(room_code, {
+        "type": "player_ready",
+        "player_id": player_id,
+        "is_ready": True,           # ← nuevo campo
+        "ready_count": ready_count,
+        "total_guessers": total_guessers,
+        "players": room.get_player_list(),
+    })
+    await maybe_reveal(room, room_code)
+
+@handles("next_clue")
+async def on_next_clue(room: GameRoom, room_code: str, player_id: str, message: NextClue):
+    if player_id == room.host_id:
+        await advance_clue(room, room_code)
+
+@handles("_timeout")
+async def on_timeout(room: GameRoom, room_code: str, player_id: str, message: PhaseTimeout):
+    # Plazo de una fase que ya terminó por otra vía
+    if message.phase != room.phase:
+        return
+    if room.state == "writing":
+        room.fill_missing_clues(TIMEOUT_PHRASE)
+        await begin_guessing(room, room_code)
+    elif room.state == "guessing" and room.reveal is None and room.current_clue_owner_id is not None:
+        # Se cierra con la aguja donde esté
+        room.fill_missing_guesses(room.last_needle_position)
+        await reveal_clue(room, room_code)
+    elif room.state == "guessing":
+        await advance_clue(room, room_code)
+
+actors = RoomActors(handle_message, lambda room_code: get_room(room_code) is not None)
+registry.gauge("wavelength_room_actors", "Room actor tasks running on this worker", lambda: len(actors))
+
+async def dispatch(owner: str, room_code: str, player_id: str, message: Message):
+    if owner == WORKER_ID:
+        # Solo se encola: la tarea de la sala es quien ejecuta el handler
+        await actors.send(room_code, player_id, message)
+    else:
+        bus.send_command(owner, room_code, player_id, message.model_dump())
+
+async def consume(inbox: asyncio.Queue, owner: str, room_code: str, player_id: str):
+    # Pasa los mensajes del socket a la sala en orden; si la sala va atrasada
+    # espera aquí y es la cola de este socket la que se llena
+    while True:
+        message = await inbox.get()
+        await dispatch(owner, room_code, player_id, message)
+        if message.type == "_disconnect":
+            return
 
 @app.websocket("/ws/{room_code}/{player_id}")
 async def websocket_endpoint(websocket: WebSocket, room_code: str, player_id: str):
     await websocket.accept()
+    if not await warmup.wait():
+        await websocket.send_text(json.dumps({"type": "error", "message": "Servidor arrancando"}))
+        await websocket.close()
+        return
 
-    room = get_room(room_code)
-    if not room:
+    owner = await store.owner_of(room_code)
+    if not owner:
         await websocket.send_text(json.dumps({"type": "error", "message": "Sala no encontrada"}))
         await websocket.close()
         return
 
-    if room_code not in connections:
-        connections[room_code] = {}
-    connections[room_code][player_id] = websocket
+    proto = websocket.query_params.get("proto", PROTO_JSON)
+    if proto not in PROTOCOLS:
+        proto = PROTO_JSON
+    watching = watched(room_code)
+    conn = broadcaster.add(room_code, player_id, websocket, proto)
+    if not watching:
+        await bus.watch(room_code)
 
-    await send_game_state(room_code)
+    try:
+        last_seen_version = int(websocket.query_params["last_seen_version"])
+    except (KeyError, ValueError):
+        last_seen_version = None
+    conn_id = f"{WORKER_ID}-{next(connection_ids)}"
+    inbox: asyncio.Queue = asyncio.Queue(maxsize=INBOUND_QUEUE_SIZE)
+    inbox.put_nowait(Connect(last_seen_version=last_seen_version, conn=conn_id))
+    consumer = asyncio.create_task(consume(inbox, owner, room_code, player_id))
+    limiter = RateLimiter(RATES)
 
     try:
         while True:
-            data = await websocket.receive_text()
-            message = json.loads(data)
-            msg_type = message.get("type")
-
-            if msg_type == "join":
-                name = message.get("name", "Jugador")
-                if player_id not in room.players:
-                    room.add_player(player_id, name)
-                    await broadcast(room_code, {"type": "player_joined", "name": name})
-                await send_game_state(room_code)
-
-            elif msg_type == "lobby_settings":
-                if player_id == room.host_id:
-                    await broadcast(room_code, {
-                        "type": "lobby_settings",
-                        "num_rounds": message.get("num_rounds", 3),
-                        "mode": message.get("mode", "free"),
-                    })
+            event = await websocket.receive()
+            if event["type"] == "websocket.disconnect":
+                break
+            try:
+                # Los tipos internos ("_connect"...) no están en el esquema de cliente
+                message = parse_client(event.get("text") or event.get("bytes") or "")
+            except ValidationError:
+                MESSAGES_REJECTED.inc("invalid", "invalid")
+                if limiter.allow("invalid"):
+                    conn.send(json.dumps({"type": "error", "message": "Mensaje no válido"}))
+                continue
+            if not limiter.allow(message.type):
+                MESSAGES_REJECTED.inc(message.type, "rate_limited")
+                continue
+            try:
+                inbox.put_nowait(message)
+            except asyncio.QueueFull:
+                MESSAGES_REJECTED.inc(message.type, "queue_full")
+    except RuntimeError:
+        # El servidor ya cerró el socket (p. ej. cola de envío llena)
+        pass
 
-            elif msg_type == "start_round":
-                if player_id == room.host_id and len(room.players) >= 2 and room.state in ["waiting", "finished"]:
-                    num_rounds = message.get("num_rounds", 3)
-                    mode = message.get("mode", "free")
-                    room.start_round(num_rounds, mode)
-                    for pid, ws in connections[room_code].items():
-                        if pid in room.players:
-                            writing_state = room.get_player_writing_state(pid)
-                            if writing_state:
-                                await ws.send_text(json.dumps({
-                                    "type": "round_started",
-                                    "state": room.state,
-                                    "players": room.get_player_list(),
-                                    "host_id": room.host_id,
-                                    **writing_state,
-                                }))
-
-            elif msg_type == "submit_clue":
-                room.submit_clue(
-                    player_id,
-                    message.get("phrase", ""),
-                    message.get("left_adjective"),
-                    message.get("right_adjective"),
-                )
-                player = room.players.get(player_id)
-                if player and not player.all_clues_submitted():
-                    writing_state = room.get_player_writing_state(player_id)
-                    if writing_state:
-                        await websocket.send_text(json.dumps({
-                            "type": "next_writing",
-                            "state": room.state,
-                            **writing_state,
-                        }))
-                    await broadcast(room_code, {"type": "writing_progress", "players": room.get_player_list()})
-                elif room.all_submitted_clues():
-                    room.start_guessing_phase()
-                    clue_info = room.get_current_clue_info()
-                    await broadcast(room_code, {
-                        "type": "guessing_started",
-                        "state": room.state,
-                        "clue": clue_info,
-                        "players": room.get_player_list(),
-                        "needle_position": room.last_needle_position,
-                        "host_id": room.host_id,
-                    })
-                else:
-                    await broadcast(room_code, {"type": "writing_progress", "players": room.get_player_list()})
-
-            elif msg_type == "move_needle":
-                position = message.get("position", 90)
-                room.last_needle_position = position
-                for pid, p in room.players.items():
-                    if pid != room.current_clue_owner_id:
-                        p.has_guessed = False
-                ready_count, total_guessers = count_active_guessers(room, room_code)
-                await broadcast(room_code, {
-                    "type": "needle_moved",
-                    "position": position,
-                    "player_id": player_id,
-                    "ready_count": ready_count,
-                    "total_guessers": total_guessers,
-                })
-
-            elif msg_type == "cancel_guess":
-                if player_id in room.players:
-                    room.players[player_id].has_guessed = False
-                ready_count, total_guessers = count_active_guessers(room, room_code)
-                await broadcast(room_code, {
-                    "type": "player_ready",
-                    "player_id": player_id,
-                    "is_ready": False,          # ← nuevo campo
-                    "ready_count": ready_count,
-                    "total_guessers": total_guessers,
-                    "players": room.get_player_list(),
-                })
-
-            elif msg_type == "submit_guess":
-                position = message.get("position", 90)
-                room.submit_guess(player_id, position)
-                ready_count, total_guessers = count_active_guessers(room, room_code)
-                await broadcast(room_code, {
-                    "type": "player_ready",
-                    "player_id": player_id,
-                    "is_ready": True,           # ← nuevo campo
-                    "ready_count": ready_count,
-                    "total_guessers": total_guessers,
-                    "players": room.get_player_list(),
-                })
-                if all_active_guessed(room, room_code):
-                    points_this_dial = room.calculate_points_current()
-                    clue_info = room.get_current_clue_info()
-                    owner_id = room.current_clue_owner_id
-                    clue_index = room.current_clue_owner_clue_index
-                    owner_target = room.players[owner_id].clues[clue_index].target_position
-                    await broadcast(room_code, {
-                        "type": "clue_reveal",
-                        "target_position": owner_target,
-                        "needle_position": room.last_needle_position,
-                        "points_this_dial": points_this_dial,
-                        "team_score": room.team_score,
-                        "clue": clue_info,
-                        "players": room.get_player_list(),
-                        "host_id": room.host_id,
-                    })
+    broadcaster.remove(room_code, player_id, conn)
+    if not watched(room_code):
+        await bus.unwatch(room_code)
+    # El _disconnect se procesa detrás de lo que quedase en la cola
+    await inbox.put(Disconnect(conn=conn_id))
+    await consumer
 
-            elif msg_type == "next_clue":
-                if player_id == room.host_id:
-                    has_more = room.next_clue()
-                    if has_more:
-                        clue_info = room.get_current_clue_info()
-                        await broadcast(room_code, {
-                            "type": "guessing_started",
-                            "state": room.state,
-                            "clue": clue_info,
-                            "players": room.get_player_list(),
-                            "needle_position": room.last_needle_position,
-                            "host_id": room.host_id,
-                        })
-                    else:
-                        player_names = [p.name for p in room.players.values()]
-                        total_dials = room.total_dials
-                        top = register_score(total_dials, room.team_score, player_names)
-                        await broadcast(room_code, {
-                            "type": "game_finished",
-                            "state": room.state,
-                            "players": room.get_player_list(),
-                            "team_score": room.team_score,
-                            "total_dials": total_dials,
-                            "leaderboard": top,
-                            "host_id": room.host_id,
-                        })
-
-    except WebSocketDisconnect:
-        if room_code in connections and player_id in connections[room_code]:
-            del connections[room_code][player_id]
-        room.remove_player(player_id)
-        await broadcast(room_code, {"type": "player_left", "player_id": player_id})
-        await send_game_state(room_code)
\ No newline at end of file
+@app.websocket("/watch/{room_code}")
+async def watch_endpoint(websocket: WebSocket, room_code: str):
+    # Público de solo lectura: recibe los eventos de la sala por lotes y nunca
+    # cuenta como jugador
+    await websocket.accept()
+    if not await warmup.wait():
+        await websocket.send_text(json.dumps({"type": "error", "message": "Servidor arrancando"}))
+        await websocket.close()
+        return
+
+    owner = await store.owner_of(room_code)
+    if not owner:
+        await websocket.send_text(json.dumps({"type": "error", "message": "Sala no encontrada"}))
+        await websocket.close()
+        return
+
+    # Único en todo el despliegue: el snapshot le llega por el bus
+    spectator_id = f"~{WORKER_ID}-{next(spectator_ids)}"
+    watching = watched(room_code)
+    if spectators.add(room_code, spectator_id, websocket) is None:
+        await websocket.send_text(json.dumps({"type": "error", "message": "Demasiados espectadores"}))
+        await websocket.close()
+        return
+    if not watching:
+        await bus.watch(room_code)
+    await dispatch(owner, room_code, spectator_id, Watch())
+
+    try:
+        while True:
+            event = await websocket.receive()
+            if event["type"] == "websocket.disconnect":
+                break
+    except RuntimeError:
+        pass
+
+    spectators.remove(room_code, spectator_id)
+    if not watched(room_code):
+        await bus.unwatch(room_code)
@@ -0,0 +1,130 @@
+from typing import Annotated, ClassVar, Literal, Optional, Tuple, Union, get_args
+
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field, TypeAdapter
+
+# Longitudes máximas de los textos libres; lo que sobra se recorta
+MAX_NAME = 32
+MAX_PHRASE = 200
+MAX_ADJECTIVE = 60
+
+
+def clipped(length: int):
+    return Annotated[str, AfterValidator(lambda value: value[:length])]
+
+
+Position = Annotated[int, Field(ge=0, le=180)]
+MAX_ROUNDS = 10
+Rounds = Annotated[int, Field(ge=1, le=MAX_ROUNDS)]
+Mode = Literal["free", "battery"]
+# En partida todos mueven la misma aguja, así que per_player y teams darían lo
+# mismo que coop; esas reglas quedan para repuntuar partidas grabadas
+Scoring = Literal["coop"]
+
+
+class Message(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    # (mensajes por segundo, ráfaga) que se permiten a un mismo socket
+    rate: ClassVar[Tuple[float, float]] = (5, 10)
+
+
+class Join(Message):
+    type: Literal["join"]
+    name: clipped(MAX_NAME) = "Jugador"
+    rate: ClassVar[Tuple[float, float]] = (1, 5)
+
+
+class LobbySettings(Message):
+    type: Literal["lobby_settings"]
+    num_rounds: Rounds = 3
+    mode: Mode = "free"
+    scoring: Scoring = "coop"
+    deck: Optional[clipped(MAX_ADJECTIVE)] = None
+    # None = no cambia
+    public: Optional[bool] = None
+
+
+class StartRound(Message):
+    type: Literal["start_round"]
+    num_rounds: Rounds = 3
+    mode: Mode = "free"
+    scoring: Scoring = "coop"
+    deck: Optional[clipped(MAX_ADJECTIVE)] = None
+
+
+class SubmitClue(Message):
+    type: Literal["submit_clue"]
+    phrase: clipped(MAX_PHRASE) = ""
+    left_adjective: Optional[clipped(MAX_ADJECTIVE)] = None
+    right_adjective: Optional[clipped(MAX_ADJECTIVE)] = None
+
+
+class MoveNeedle(Message):
+    type: Literal["move_needle"]
+    position: Position = 90
+    # El dial manda un evento por cada par de grados al arrastrar
+    rate: ClassVar[Tuple[float, float]] = (60, 60)
+
+
+class SubmitGuess(Message):
+    type: Literal["submit_guess"]
+    position: Position = 90
+    rate: ClassVar[Tuple[float, float]] = (20, 40)
+
+
+class CancelGuess(Message):
+    type: Literal["cancel_guess"]
+    rate: ClassVar[Tuple[float, float]] = (20, 40)
+
+
+class NextClue(Message):
+    type: Literal["next_clue"]
+
+
+# Mensajes internos del servidor: nunca se aceptan desde un socket
+class Connect(Message):
+    type: Literal["_connect"] = "_connect"
+    last_seen_version: Optional[int] = None
+    # Socket que abre o cierra el jugador (único en todo el despliegue)
+    conn: str = ""
+
+
+class Disconnect(Message):
+    type: Literal["_disconnect"] = "_disconnect"
+    conn: str = ""
+
+
+class Expire(Message):
+    type: Literal["_expire"] = "_expire"
+
+
+class Watch(Message):
+    type: Literal["_watch"] = "_watch"
+
+
+class PhaseTimeout(Message):
+    type: Literal["_timeout"] = "_timeout"
+    phase: int
+
+
+CLIENT_MESSAGES = (Join, LobbySettings, StartRound, SubmitClue, MoveNeedle, SubmitGuess, CancelGuess, NextClue)
+INTERNAL_MESSAGES = (Connect, Disconnect, Expire, PhaseTimeout, Watch)
+
+ClientMessage = Annotated[Union[CLIENT_MESSAGES], Field(discriminator="type")]
+AnyMessage = Annotated[Union[CLIENT_MESSAGES + INTERNAL_MESSAGES], Field(discriminator="type")]
+
+# Los validadores se compilan una vez al importar
+client_adapter = TypeAdapter(ClientMessage)
+any_adapter = TypeAdapter(AnyMessage)
+
+RATES = {get_args(model.model_fields["type"].annotation)[0]: model.rate for model in CLIENT_MESSAGES}
+
+
+def parse_client(data: Union[str, bytes]) -> Message:
+    # Valida directamente el JSON crudo, sin pasar por json.loads
+    return client_adapter.validate_json(data)
+
+
+def parse_command(message: dict) -> Message:
+    # Comandos que llegan por el bus o de temporizadores propios
+    return any_adapter.validate_python(message)
+
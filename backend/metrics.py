@@ -0,0 +1,297 @@
+import asyncio
+import bisect
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter as Tally
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Cada cuánto se mide el retraso del event loop (segundos)
+LOOP_LAG_INTERVAL = float(os.environ.get("LOOP_LAG_INTERVAL", "0.5"))
+# Muestras por segundo del profiler cuando está activo
+PROFILE_HZ = float(os.environ.get("PROFILE_HZ", "100"))
+# Token para /debug/profile; sin token los endpoints no existen
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+
+# Buckets en segundos: de 50 µs a 2.5 s
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+Labels = Tuple[str, ...]
+
+
+def format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{n}="{escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        ...
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{format_labels(self.labels, key)} {format_value(value)}")
+        return lines
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    # El valor se lee al exportar: no hay que mantenerlo al día en el camino caliente
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        super().__init__(name, help)
+        self.read = read
+
+    def render(self) -> List[str]:
+        try:
+            value = self.read()
+        except Exception:
+            logger.exception("gauge %s failed", self.name)
+            return []
+        return self.header() + [f"{self.name} {format_value(value)}"]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # Por etiqueta: cuentas por bucket (no acumuladas), suma y total
+        self.series: Dict[Labels, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, read: Callable[[], float]) -> Gauge:
+        return self.register(Gauge(name, help, read))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HANDLER_SECONDS = registry.histogram(
+    "wavelength_handler_seconds", "Time spent handling one websocket message", ["type"])
+BROADCAST_SECONDS = registry.histogram(
+    "wavelength_broadcast_fanout_seconds", "Time spent queueing one broadcast to every socket of a room")
+SEND_FAILURES = registry.counter(
+    "wavelength_send_failures_total", "Frames that could not be delivered", ["reason"])
+MESSAGES_REJECTED = registry.counter(
+    "wavelength_messages_rejected_total", "Client messages dropped before reaching a handler", ["type", "reason"])
+HANDLER_ERRORS = registry.counter(
+    "wavelength_handler_errors_total", "Handlers that raised an exception", ["type"])
+LOOP_LAG_SECONDS = registry.histogram(
+    "wavelength_event_loop_lag_seconds", "Delay of the event loop over a scheduled sleep")
+JOURNAL_ENTRIES = registry.counter(
+    "wavelength_journal_entries_total", "Room journal entries queued for disk", ["op"])
+JOURNAL_FSYNC_SECONDS = registry.histogram(
+    "wavelength_journal_fsync_seconds", "Time to write and fsync one batch of journal entries")
+ANALYTICS_EVENTS = registry.counter(
+    "wavelength_analytics_events_total", "Analytics events queued, or dropped when the queue was full", ["kind"])
+ANALYTICS_WRITE_SECONDS = registry.histogram(
+    "wavelength_analytics_write_seconds", "Time to store one batch of analytics events and update aggregates")
+SPECTATOR_FANOUT_SECONDS = registry.histogram(
+    "wavelength_spectator_fanout_seconds", "Time one relay task spends queueing a frame to its spectators")
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL):
+        self.interval = interval
+        self.last = 0.0
+        self.max = 0.0
+        self.task = None
+
+    async def run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self.last = lag
+            self.max = max(self.max, lag)
+            LOOP_LAG_SECONDS.observe(lag)
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+
+
+class SamplingProfiler:
+    # SIGPROF salta cada 1/hz segundos de CPU del proceso y el manejador apunta
+    # qué función nuestra se estaba ejecutando y para qué tipo de mensaje.
+    # Con el proceso ocioso no llegan señales: solo se muestrea trabajo real.
+    def __init__(self, hz: float = PROFILE_HZ):
+        self.interval = 1.0 / hz
+        self.current_type: Optional[str] = None
+        self.samples: Tally = Tally()
+        self.by_type: Tally = Tally()
+        self.total = 0
+        self.started_at = 0.0
+        self.until = 0.0
+        self.running = False
+        self.library_paths = tuple({sys.prefix, sys.base_prefix, "<"})
+
+    @property
+    def available(self) -> bool:
+        # Las señales solo se pueden instalar desde el hilo principal (el del event loop)
+        return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+    def start(self, seconds: float) -> bool:
+        if not self.available:
+            return False
+        self.until = time.monotonic() + seconds
+        if self.running:
+            return True
+        self.samples.clear()
+        self.by_type.clear()
+        self.total = 0
+        self.started_at = time.monotonic()
+        self.running = True
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return True
+
+    def stop(self):
+        if not self.running:
+            return
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_IGN)
+        self.running = False
+
+    def _sample(self, signum, frame):
+        if time.monotonic() >= self.until:
+            self.stop()
+            return
+        msg_type = self.current_type or "-"
+        self.total += 1
+        self.by_type[msg_type] += 1
+        # Se atribuye la muestra a la función más interna de nuestro código
+        leaf = frame
+        while frame is not None:
+            if not frame.f_code.co_filename.startswith(self.library_paths):
+                leaf = frame
+                break
+            frame = frame.f_back
+        if leaf is None:
+            return
+        code = leaf.f_code
+        self.samples[(msg_type, f"{os.path.basename(code.co_filename)}:{code.co_name}:{leaf.f_lineno}")] += 1
+
+    def report(self, top: int = 30) -> dict:
+        return {
+            "running": self.running,
+            "available": self.available,
+            "elapsed_s": round((time.monotonic() - self.started_at) if self.started_at else 0.0, 3),
+            "cpu_samples": self.total,
+            "sample_ms": round(self.interval * 1000, 3),
+            "by_type": dict(self.by_type.most_common()),
+            "top": [
+                {"type": msg_type, "where": where, "samples": n}
+                for (msg_type, where), n in self.samples.most_common(top)
+            ],
+        }
+
+
+profiler = SamplingProfiler()
+
+
+class timed_handler:
+    # Mide un handler y deja su tipo visible al profiler mientras dura
+    __slots__ = ("msg_type", "start", "previous")
+
+    def __init__(self, msg_type: str):
+        self.msg_type = msg_type
+
+    def __enter__(self):
+        self.previous = profiler.current_type
+        profiler.current_type = self.msg_type
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        HANDLER_SECONDS.observe(time.perf_counter() - self.start, self.msg_type)
+        profiler.current_type = self.previous
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import os
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+
+# Frecuencia máxima de envío de la aguja por sala (frames por segundo)
+NEEDLE_TICK_HZ = float(os.environ.get("NEEDLE_TICK_HZ", "25"))
+
+
+class NeedleStats:
+    def __init__(self):
+        self.events = 0
+        self.flushes = 0
+        self.frames_saved = 0
+        self.bytes_saved = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "events": self.events,
+            "flushes": self.flushes,
+            "frames_saved": self.frames_saved,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+# Agrupa los move_needle: solo se guarda la última posición de cada sala y se
+# envía como mucho una vez por tick
+class NeedleChannel:
+    def __init__(self, publish: Callable[[str, str], None], ready_counts: Callable[[str], Tuple[int, int]],
+                 recipients: Callable[[str], int], tick_hz: float = NEEDLE_TICK_HZ):
+        self.publish = publish
+        self.ready_counts = ready_counts
+        self.recipients = recipients
+        self.interval = 1.0 / tick_hz if tick_hz > 0 else 0.0
+        self._pending: Dict[str, Tuple[int, str]] = {}
+        self._coalesced: Dict[str, int] = {}
+        self._handles: Dict[str, asyncio.TimerHandle] = {}
+        self._last_flush: Dict[str, float] = {}
+        self._last_counts: Dict[str, Tuple[int, int]] = {}
+        self.room_stats: Dict[str, NeedleStats] = {}
+
+    def update(self, room_code: str, position: int, player_id: str):
+        stats = self.room_stats.setdefault(room_code, NeedleStats())
+        stats.events += 1
+        self._pending[room_code] = (position, player_id)
+        self._coalesced[room_code] = self._coalesced.get(room_code, 0) + 1
+        if room_code in self._handles:
+            return
+        elapsed = time.monotonic() - self._last_flush.get(room_code, 0.0)
+        if elapsed >= self.interval:
+            self.flush(room_code)
+        else:
+            loop = asyncio.get_running_loop()
+            self._handles[room_code] = loop.call_later(self.interval - elapsed, self.flush, room_code)
+
+    def flush(self, room_code: str):
+        handle = self._handles.pop(room_code, None)
+        if handle:
+            handle.cancel()
+        pending = self._pending.pop(room_code, None)
+        if pending is None:
+            return
+        coalesced = self._coalesced.pop(room_code, 1)
+        self._last_flush[room_code] = time.monotonic()
+        position, player_id = pending
+        message = {"type": "needle_moved", "position": position, "player_id": player_id}
+        counts = self.ready_counts(room_code)
+        # Los contadores solo viajan cuando cambian
+        if counts != self._last_counts.get(room_code):
+            self._last_counts[room_code] = counts
+            message["ready_count"], message["total_guessers"] = counts
+        text = json.dumps(message)
+        self.publish(room_code, text)
+
+        stats = self.room_stats[room_code]
+        stats.flushes += 1
+        saved = (coalesced - 1) * self.recipients(room_code)
+        stats.frames_saved += saved
+        stats.bytes_saved += saved * len(text)
+
+    def before_broadcast(self, room_code: str, message: dict):
+        # Mantiene el orden: la aguja pendiente sale antes que cualquier otro evento
+        self.flush(room_code)
+        if "ready_count" in message:
+            self._last_counts[room_code] = (message["ready_count"], message["total_guessers"])
+        else:
+            self._last_counts.pop(room_code, None)
+
+    def discard(self, room_code: str):
+        handle = self._handles.pop(room_code, None)
+        if handle:
+            handle.cancel()
+        self._pending.pop(room_code, None)
+        self._coalesced.pop(room_code, None)
+        self._last_flush.pop(room_code, None)
+        self._last_counts.pop(room_code, None)
+        self.room_stats.pop(room_code, None)
+
+    def stats(self, room_code: str) -> Optional[dict]:
+        stats = self.room_stats.get(room_code)
+        return stats.as_dict() if stats else None
+
+    def all_stats(self) -> dict:
+        return {code: s.as_dict() for code, s in self.room_stats.items()}
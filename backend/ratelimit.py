@@ -0,0 +1,28 @@
+import time
+from typing import Dict, List, Tuple
+
+
+# Token bucket por tipo de mensaje para un socket: cada tipo tiene su ritmo y
+# su ráfaga, y un tipo saturado no bloquea a los demás
+class RateLimiter:
+    __slots__ = ("rates", "default", "buckets")
+
+    def __init__(self, rates: Dict[str, Tuple[float, float]], default: Tuple[float, float] = (5, 10)):
+        self.rates = rates
+        self.default = default
+        # tipo -> [tokens, último instante]
+        self.buckets: Dict[str, List[float]] = {}
+
+    def allow(self, key: str) -> bool:
+        rate, burst = self.rates.get(key, self.default)
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [burst, now]
+        else:
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
@@ -0,0 +1,126 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Deadline:
+    __slots__ = ("when", "seq", "room_code", "kind", "callback", "cancelled")
+
+    def __init__(self, when: float, seq: int, room_code: str, kind: str, callback: Callable[[], None]):
+        self.when = when
+        self.seq = seq
+        self.room_code = room_code
+        self.kind = kind
+        self.callback = callback
+        self.cancelled = False
+
+    def __lt__(self, other: "Deadline") -> bool:
+        return (self.when, self.seq) < (other.when, other.seq)
+
+
+# Plazos de todas las salas en un único heap con un solo timer del event loop
+# armado para el más próximo. Cada sala tiene como mucho un plazo por tipo;
+# programar otro del mismo tipo sustituye al anterior. Cancelar es O(1): la
+# entrada se marca y se descarta al llegar a la cima del heap.
+class DeadlineScheduler:
+    def __init__(self):
+        self.heap: List[Deadline] = []
+        self.rooms: Dict[str, Dict[str, Deadline]] = {}
+        self.counter = itertools.count()
+        self.handle: Optional[asyncio.TimerHandle] = None
+        self.armed_at = 0.0
+        self.live = 0
+        self.fired = 0
+
+    def schedule(self, room_code: str, kind: str, delay: float, callback: Callable[[], None]) -> Deadline:
+        self.cancel(room_code, kind)
+        loop = asyncio.get_running_loop()
+        entry = Deadline(loop.time() + delay, next(self.counter), room_code, kind, callback)
+        self.rooms.setdefault(room_code, {})[kind] = entry
+        self.live += 1
+        # Si lo cancelado domina el heap se reconstruye para no acumular basura
+        if len(self.heap) > 2 * self.live + 64:
+            self.heap = [e for e in self.heap if not e.cancelled]
+            heapq.heapify(self.heap)
+        heapq.heappush(self.heap, entry)
+        if self.handle is None or entry.when < self.armed_at:
+            self._arm(loop)
+        return entry
+
+    def cancel(self, room_code: str, kind: Optional[str] = None):
+        kinds = self.rooms.get(room_code)
+        if not kinds:
+            return
+        if kind is None:
+            for entry in kinds.values():
+                entry.cancelled = True
+            self.live -= len(kinds)
+            del self.rooms[room_code]
+            return
+        entry = kinds.pop(kind, None)
+        if entry:
+            entry.cancelled = True
+            self.live -= 1
+        if not kinds:
+            del self.rooms[room_code]
+
+    def remaining(self, room_code: str, kind: str) -> Optional[float]:
+        entry = self.rooms.get(room_code, {}).get(kind)
+        if entry is None:
+            return None
+        return max(0.0, entry.when - asyncio.get_running_loop().time())
+
+    def deadline(self, room_code: str, kind: str) -> Optional[float]:
+        # En hora de pared, para mandársela a los clientes
+        left = self.remaining(room_code, kind)
+        return None if left is None else round(time.time() + left, 1)
+
+    def _arm(self, loop: asyncio.AbstractEventLoop):
+        if self.handle:
+            self.handle.cancel()
+            self.handle = None
+        while self.heap and self.heap[0].cancelled:
+            heapq.heappop(self.heap)
+        if self.heap:
+            self.armed_at = self.heap[0].when
+            self.handle = loop.call_at(self.armed_at, self._fire)
+
+    def _fire(self):
+        self.handle = None
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        while self.heap and self.heap[0].when <= now:
+            entry = heapq.heappop(self.heap)
+            if entry.cancelled:
+                continue
+            kinds = self.rooms.get(entry.room_code)
+            if kinds and kinds.get(entry.kind) is entry:
+                del kinds[entry.kind]
+                if not kinds:
+                    del self.rooms[entry.room_code]
+            self.live -= 1
+            self.fired += 1
+            try:
+                entry.callback()
+            except Exception:
+                logger.exception("deadline %s failed for room %s", entry.kind, entry.room_code)
+        self._arm(loop)
+
+    def stop(self):
+        if self.handle:
+            self.handle.cancel()
+            self.handle = None
+        self.heap.clear()
+        self.rooms.clear()
+        self.live = 0
+
+    def __len__(self) -> int:
+        return self.live
+
+    def stats(self) -> dict:
+        return {"pending": len(self), "heap": len(self.heap), "fired": self.fired}
@@ -0,0 +1,216 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+# NumPy solo se usa para repuntuar en lote y es opcional: se importa al
+# necesitarlo (load_numpy) y no en cada arranque del servidor
+np = None
+
+DIAL_MAX = 180
+TEAMS = ("A", "B")
+
+
+def load_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return None
+        np = numpy
+    return np
+
+
+def parse_zones(spec: str) -> Tuple[Tuple[int, int], ...]:
+    # "5:4,11:3,19:2" -> (distancia máxima, puntos) de cada zona, de dentro afuera
+    zones = []
+    for part in spec.split(","):
+        width, points = part.split(":")
+        zones.append((int(width), int(points)))
+    return tuple(sorted(zones))
+
+
+SCORING_ZONES = parse_zones(os.environ.get("SCORING_ZONES", "5:4,11:3,19:2"))
+# Si se indica, cada partida terminada se añade como una línea JSON para poder
+# volver a puntuarla después (bench/bench_scoring.py --records)
+GAME_RECORDS_FILE = os.environ.get("GAME_RECORDS_FILE", "")
+# Punto extra del equipo rival si acierta hacia qué lado cae el objetivo
+SIDE_BONUS = int(os.environ.get("SCORING_SIDE_BONUS", "1"))
+
+
+def build_table(zones: Sequence[Tuple[int, int]]) -> bytes:
+    # Puntos para cada distancia entera posible del dial: se calcula una vez
+    table = bytearray(DIAL_MAX + 1)
+    for diff in range(DIAL_MAX + 1):
+        table[diff] = next((points for width, points in zones if diff <= width), 0)
+    return bytes(table)
+
+
+class DialScore(NamedTuple):
+    points: int
+    # Reparto por jugador o por equipo; vacío en el modo cooperativo
+    breakdown: Dict[str, int]
+
+
+# (player_id, equipo, posición)
+Guess = Tuple[str, int, int]
+
+
+class RuleSet(ABC):
+    name = ""
+
+    def __init__(self, zones: Sequence[Tuple[int, int]] = SCORING_ZONES, side_bonus: int = SIDE_BONUS):
+        self.zones = tuple(zones)
+        self.table = build_table(self.zones)
+        self.max_points = max((points for _, points in self.zones), default=0)
+        self.side_bonus = side_bonus
+
+    def zone(self, total: int, count: int, target: int) -> int:
+        # Distancia de la media al objetivo redondeada hacia arriba, en enteros:
+        # equivale a comparar la media exacta con los umbrales
+        if count == 0:
+            return 0
+        return self.table[min(-(-abs(total - count * target) // count), DIAL_MAX)]
+
+    @abstractmethod
+    def score(self, target: int, guesses: Sequence[Guess], owner_team: int = 0) -> DialScore:
+        ...
+
+    @abstractmethod
+    def score_batch(self, targets, positions, teams, owner_teams):
+        # targets/owner_teams (n,), positions/teams (n, k) con -1 de relleno
+        ...
+
+    def _zone_batch(self, totals, counts, targets):
+        table = np.frombuffer(self.table, dtype=np.uint8).astype(np.int64)
+        diff = -(-np.abs(totals - counts * targets) // np.maximum(counts, 1))
+        return np.where(counts > 0, table[np.minimum(diff, DIAL_MAX)], 0)
+
+
+class Cooperative(RuleSet):
+    # La media de todas las adivinanzas puntúa para el grupo
+    name = "coop"
+
+    def score(self, target, guesses, owner_team=0):
+        return DialScore(self.zone(sum(g[2] for g in guesses), len(guesses), target), {})
+
+    def score_batch(self, targets, positions, teams, owner_teams):
+        mask = positions >= 0
+        return self._zone_batch(np.where(mask, positions, 0).sum(1), mask.sum(1), targets)
+
+
+class PerPlayer(RuleSet):
+    # Cada adivinanza puntúa por separado para quien la hizo
+    name = "per_player"
+
+    def score(self, target, guesses, owner_team=0):
+        breakdown = {pid: self.table[abs(position - target)] for pid, _, position in guesses}
+        return DialScore(sum(breakdown.values()), breakdown)
+
+    def score_batch(self, targets, positions, teams, owner_teams):
+        table = np.frombuffer(self.table, dtype=np.uint8).astype(np.int64)
+        diff = np.minimum(np.abs(positions - targets[:, None]), DIAL_MAX)
+        return np.where(positions >= 0, table[diff], 0).sum(1)
+
+
+class TeamsWithBonus(RuleSet):
+    # El equipo de la pista puntúa con su media; el rival gana el bonus si la
+    # mayoría de sus agujas cae del mismo lado que el objetivo respecto a esa media.
+    # Sin compañeros presentes adivina toda la sala y no hay bonus
+    name = "teams"
+
+    def score(self, target, guesses, owner_team=0):
+        own = [g for g in guesses if g[1] == owner_team]
+        rivals = [g for g in guesses if g[1] != owner_team] if own else []
+        own = own or list(guesses)
+        count = len(own)
+        total = sum(g[2] for g in own)
+        points = self.zone(total, count, target)
+        bonus = 0
+        side = (target * count > total) - (target * count < total)
+        if rivals and side and points < self.max_points:
+            correct = sum(1 for g in rivals if (g[2] * count > total) - (g[2] * count < total) == side)
+            if 2 * correct > len(rivals):
+                bonus = self.side_bonus
+        return DialScore(points + bonus, {TEAMS[owner_team]: points, TEAMS[1 - owner_team]: bonus})
+
+    def score_batch(self, targets, positions, teams, owner_teams):
+        mask = positions >= 0
+        own = mask & (teams == owner_teams[:, None])
+        side_mask = np.where(own.any(1)[:, None], own, mask)
+        counts = side_mask.sum(1)
+        totals = np.where(side_mask, positions, 0).sum(1)
+        points = self._zone_batch(totals, counts, targets)
+        rivals = mask & ~side_mask
+        side = np.sign(targets * counts - totals)
+        votes = np.sign(positions * counts[:, None] - totals[:, None])
+        correct = (rivals & (votes == side[:, None]) & (side[:, None] != 0)).sum(1)
+        bonus = np.where((2 * correct > rivals.sum(1)) & (points < self.max_points), self.side_bonus, 0)
+        return points + bonus
+
+
+RULE_SETS: Dict[str, RuleSet] = {rules.name: rules for rules in (Cooperative(), PerPlayer(), TeamsWithBonus())}
+DEFAULT_RULES = "coop"
+
+
+class DialBatch(NamedTuple):
+    # Pistas de muchas partidas en columnas; adivinanzas con -1 de relleno
+    targets: "np.ndarray"
+    owner_teams: "np.ndarray"
+    positions: "np.ndarray"
+    teams: "np.ndarray"
+    game_index: "np.ndarray"
+    games: int
+
+
+def pack(games: List[dict]) -> DialBatch:
+    # Partidas grabadas ({"dials": [{"target", "owner_team", "guesses":
+    # [[equipo, posición], ...]}]}) a arrays; se hace una vez por conjunto
+    if load_numpy() is None:
+        raise RuntimeError("batch rescoring requires the 'numpy' package")
+    dials = [d for game in games for d in game["dials"]]
+    count = len(dials)
+    lengths = np.fromiter((len(d["guesses"]) for d in dials), dtype=np.int64, count=count)
+    width = max(1, int(lengths.max(initial=0)))
+    flat = np.array([x for d in dials for g in d["guesses"] for x in g], dtype=np.int64).reshape(-1, 2)
+    rows = np.repeat(np.arange(count), lengths)
+    cols = np.arange(len(flat)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    positions = np.full((count, width), -1, dtype=np.int64)
+    teams = np.full((count, width), -1, dtype=np.int64)
+    positions[rows, cols] = flat[:, 1]
+    teams[rows, cols] = flat[:, 0]
+    return DialBatch(
+        np.fromiter((d["target"] for d in dials), dtype=np.int64, count=count),
+        np.fromiter((d["owner_team"] for d in dials), dtype=np.int64, count=count),
+        positions,
+        teams,
+        np.repeat(np.arange(len(games)), [len(game["dials"]) for game in games]),
+        len(games),
+    )
+
+
+def rescore_batch(batch: DialBatch, rules: RuleSet) -> List[int]:
+    # Todas las pistas de golpe con NumPy: total de puntos de cada partida
+    points = rules.score_batch(batch.targets, batch.positions, batch.teams, batch.owner_teams)
+    return np.bincount(batch.game_index, weights=points, minlength=batch.games).astype(np.int64).tolist()
+
+
+def rescore(games: List[dict], rules: RuleSet) -> List[int]:
+    # Lo mismo pista a pista, sin NumPy
+    return [
+        sum(rules.score(d["target"], [(str(i), t, p) for i, (t, p) in enumerate(d["guesses"])],
+                        d["owner_team"]).points
+            for d in game["dials"])
+        for game in games
+    ]
+
+
+def append_record(path: str, record: dict):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def load_records(path: str) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
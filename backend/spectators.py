@@ -0,0 +1,204 @@
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional
+
+from fastapi import WebSocket
+
+from broadcaster import Connection, RoomStats
+from metrics import SPECTATOR_FANOUT_SECONDS
+
+# Frames por segundo que recibe el público de una sala
+SPECTATOR_TICK_HZ = float(os.environ.get("SPECTATOR_TICK_HZ", "4"))
+# Espectadores que atiende cada tarea de reenvío
+SPECTATOR_FANOUT = int(os.environ.get("SPECTATOR_FANOUT", "64"))
+# Máximo de espectadores por sala en este worker
+MAX_SPECTATORS = int(os.environ.get("MAX_SPECTATORS", "1000"))
+# Frames pendientes por espectador antes de expulsarlo; van a pocos por segundo
+SPECTATOR_QUEUE_SIZE = int(os.environ.get("SPECTATOR_QUEUE_SIZE", "16"))
+
+NEEDLE_PREFIX = '{"type": "needle_moved"'
+
+
+# Una tarea que reparte cada frame de la sala a su grupo de espectadores. Con
+# varios grupos el reparto se trocea en turnos del bucle y los mensajes de los
+# jugadores se cuelan entre uno y otro
+class Relay:
+    def __init__(self):
+        self.conns: Dict[str, Connection] = {}
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            frame = await self.queue.get()
+            start = time.perf_counter()
+            for conn in list(self.conns.values()):
+                conn.send(frame)
+            SPECTATOR_FANOUT_SECONDS.observe(time.perf_counter() - start)
+
+    def stop(self):
+        self.task.cancel()
+
+
+class AudienceStats:
+    def __init__(self):
+        self.events = 0
+        self.coalesced = 0
+        self.frames = 0
+        self.bytes = 0
+
+    def as_dict(self, spectators: int, relays: int, sockets: RoomStats) -> dict:
+        return {
+            "spectators": spectators,
+            "relays": relays,
+            "events": self.events,
+            "coalesced": self.coalesced,
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "dropped": sockets.dropped,
+            "evicted": sockets.evicted,
+        }
+
+
+class Audience:
+    def __init__(self):
+        self.relays: List[Relay] = []
+        self.where: Dict[str, Relay] = {}
+        self.pending: List[str] = []
+        # Índice en pending de la aguja si es lo último encolado, para sustituirla
+        self.needle_at: Optional[int] = None
+        self.handle: Optional[asyncio.TimerHandle] = None
+        self.stats = AudienceStats()
+        self.socket_stats = RoomStats()
+
+
+# Público de las salas: conexiones de solo lectura que no pasan por el
+# broadcaster de los jugadores. Los eventos de la sala se acumulan y salen
+# juntos como mucho SPECTATOR_TICK_HZ veces por segundo en un único frame
+# {"type": "batch", "events": [...]}, que se serializa una vez y comparten
+# todos los espectadores. De la aguja solo viaja la última posición
+class SpectatorFeed:
+    def __init__(self, tick_hz: float = SPECTATOR_TICK_HZ, fanout: int = SPECTATOR_FANOUT,
+                 max_spectators: int = MAX_SPECTATORS, max_queue: int = SPECTATOR_QUEUE_SIZE):
+        self.interval = 1.0 / tick_hz if tick_hz > 0 else 0.0
+        self.fanout = fanout
+        self.max_spectators = max_spectators
+        self.max_queue = max_queue
+        self.rooms: Dict[str, Audience] = {}
+
+    def __contains__(self, room_code: str) -> bool:
+        return room_code in self.rooms
+
+    def count(self, room_code: str) -> int:
+        audience = self.rooms.get(room_code)
+        return len(audience.where) if audience else 0
+
+    def add(self, room_code: str, spectator_id: str, websocket: WebSocket) -> Optional[Connection]:
+        if self.count(room_code) >= self.max_spectators:
+            return None
+        audience = self.rooms.setdefault(room_code, Audience())
+        relay = next((r for r in audience.relays if len(r.conns) < self.fanout), None)
+        if relay is None:
+            relay = Relay()
+            audience.relays.append(relay)
+        conn = Connection(websocket, audience.socket_stats, self.max_queue)
+        relay.conns[spectator_id] = conn
+        audience.where[spectator_id] = relay
+        return conn
+
+    def remove(self, room_code: str, spectator_id: str):
+        audience = self.rooms.get(room_code)
+        if not audience or spectator_id not in audience.where:
+            return
+        relay = audience.where.pop(spectator_id)
+        relay.conns.pop(spectator_id).close()
+        if not relay.conns:
+            relay.stop()
+            audience.relays.remove(relay)
+        if not audience.where:
+            self._discard(room_code)
+
+    def publish(self, room_code: str, text: str):
+        audience = self.rooms.get(room_code)
+        if not audience:
+            return
+        audience.stats.events += 1
+        # Una aguja sustituye a la anterior salvo que esta traiga contadores o
+        # haya otro evento detrás: adelantarla desordenaría el batch
+        if text.startswith(NEEDLE_PREFIX):
+            at = audience.needle_at
+            if at is not None and '"ready_count"' not in audience.pending[at]:
+                audience.pending[at] = text
+                audience.stats.coalesced += 1
+                return
+            audience.needle_at = len(audience.pending)
+        else:
+            audience.needle_at = None
+        audience.pending.append(text)
+        if audience.handle is None:
+            audience.handle = asyncio.get_running_loop().call_later(self.interval, self.flush, room_code)
+
+    def _take_frame(self, audience: Audience) -> Optional[str]:
+        if audience.handle:
+            audience.handle.cancel()
+            audience.handle = None
+        events, audience.pending, audience.needle_at = audience.pending, [], None
+        if not events:
+            return None
+        # Los eventos ya vienen serializados: se unen sin volver a codificarlos
+        frame = '{"type": "batch", "events": [' + ", ".join(events) + "]}"
+        audience.stats.frames += 1
+        audience.stats.bytes += len(frame)
+        return frame
+
+    def flush(self, room_code: str):
+        audience = self.rooms.get(room_code)
+        frame = self._take_frame(audience) if audience else None
+        if frame is None:
+            return
+        # Cada relay reparte desfasado dentro del tick: los envíos de cientos de
+        # sockets no despiertan todos en la misma vuelta del bucle
+        step = self.interval / len(audience.relays)
+        loop = asyncio.get_running_loop()
+        for i, relay in enumerate(audience.relays):
+            if i == 0 or step == 0:
+                relay.queue.put_nowait(frame)
+            else:
+                loop.call_later(i * step, relay.queue.put_nowait, frame)
+
+    def send_text(self, room_code: str, spectator_id: str, text: str) -> bool:
+        audience = self.rooms.get(room_code)
+        relay = audience.where.get(spectator_id) if audience else None
+        if relay is None:
+            return False
+        return relay.conns[spectator_id].send(text)
+
+    def _discard(self, room_code: str):
+        audience = self.rooms.pop(room_code)
+        if audience.handle:
+            audience.handle.cancel()
+        for relay in audience.relays:
+            relay.stop()
+
+    def close_room(self, room_code: str):
+        audience = self.rooms.get(room_code)
+        if not audience:
+            return
+        # Lo pendiente (p. ej. room_closed) sale antes de cerrar, sin esperar a los relays
+        frame = self._take_frame(audience)
+        for relay in audience.relays:
+            for conn in relay.conns.values():
+                if frame is not None:
+                    conn.send(frame)
+                conn.drain_and_close()
+        self._discard(room_code)
+
+    def socket_count(self) -> int:
+        return sum(len(audience.where) for audience in self.rooms.values())
+
+    def all_stats(self) -> dict:
+        return {
+            code: audience.stats.as_dict(len(audience.where), len(audience.relays), audience.socket_stats)
+            for code, audience in self.rooms.items()
+        }
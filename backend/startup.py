@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Step = Tuple[str, Callable[[], Awaitable[None]]]
+
+
+# Calentamiento del servidor en segundo plano: uvicorn abre el puerto en
+# cuanto el lifespan cede y las piezas lentas (tabla de récords, mazos, salas
+# del journal) se cargan después, paso a paso y cronometradas. Lo que dependa
+# de ellas espera con wait(); /ready no da 200 hasta que todo ha terminado
+class Warmup:
+    def __init__(self, steps: List[Step]):
+        self.steps = steps
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self.ready = False
+        self.error: Optional[str] = None
+        self.seconds = 0.0
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        for name, step in self.steps:
+            start = time.perf_counter()
+            try:
+                await step()
+            except Exception as e:
+                # Sin este paso el servidor no está listo, pero sigue vivo para diagnosticarlo
+                logger.exception("warm-up step %s failed", name)
+                self.error = f"{name}: {e!r}"
+                raise
+            self.timings[name] = time.perf_counter() - start
+        self.seconds = time.perf_counter() - self.started
+        self.ready = True
+        logger.info("ready in %.2fs %s", self.seconds, {k: round(v, 3) for k, v in self.timings.items()})
+
+    async def wait(self) -> bool:
+        if self.ready:
+            return True
+        if self.task is None:
+            return False
+        try:
+            await asyncio.shield(self.task)
+        except Exception:
+            return False
+        return self.ready
+
+    async def stop(self):
+        if self.task and not self.task.done():
+            self.task.cancel()
+            try:
+                await self.task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    def report(self) -> dict:
+        return {
+            "ready": self.ready,
+            "error": self.error,
+            "warmup_seconds": round(self.seconds if self.ready else time.perf_counter() - self.started, 3),
+            "steps": {name: round(seconds, 3) for name, seconds in self.timings.items()},
+        }
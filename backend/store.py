@@ -0,0 +1,364 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from game import GameRoom
+
+logger = logging.getLogger(__name__)
+
+# "memory" (un solo proceso) o "redis" (varios workers compartiendo salas)
+ROOM_BACKEND = os.environ.get("ROOM_BACKEND", "memory")
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+KEY_PREFIX = "wavelength"
+
+# Identificador de este proceso dentro del despliegue
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+# Segundos sin latido tras los que un worker se da por caído: sus salas dejan
+# de existir para los demás y sus códigos se pueden volver a usar
+WORKER_TTL = int(os.environ.get("WORKER_TTL", "15"))
+
+
+CODE_MIN = 1000
+CODE_MAX = 9999
+
+
+def room_key(code: str) -> str:
+    # Clave de Redis con el worker dueño de la sala
+    return f"{KEY_PREFIX}:room:{code}"
+
+
+def worker_key(worker_id: str) -> str:
+    # Clave de Redis que cada worker renueva mientras está vivo
+    return f"{KEY_PREFIX}:worker:{worker_id}"
+
+
+# Cada sala pertenece a un único worker, que es el único que la modifica; el
+# resto solo necesita saber que existe y quién es su dueño
+class RoomStore(ABC):
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    @abstractmethod
+    def get(self, code: str) -> Optional[GameRoom]:
+        ...
+
+    @abstractmethod
+    async def create(self) -> GameRoom:
+        ...
+
+    @abstractmethod
+    async def remove(self, code: str):
+        ...
+
+    @abstractmethod
+    async def owner_of(self, code: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def codes(self) -> Iterable[str]:
+        ...
+
+    @abstractmethod
+    async def adopt(self, rooms: Dict[str, GameRoom], previous_owners: Set[str]) -> List[GameRoom]:
+        # Salas recuperadas del journal al arrancar; previous_owners son los
+        # WORKER_ID con los que este mismo worker las tuvo antes de reiniciarse
+        ...
+
+    def touch(self, code: str):
+        pass
+
+    @abstractmethod
+    def oldest(self) -> Iterable[str]:
+        ...
+
+    @abstractmethod
+    def idle_for(self, code: str) -> float:
+        ...
+
+    def __len__(self) -> int:
+        return len(list(self.codes()))
+
+
+class MemoryRoomStore(RoomStore):
+    def __init__(self):
+        self.rooms: Dict[str, GameRoom] = {}
+        # Códigos libres barajados: coger uno es O(1) aunque la sala esté casi llena
+        self.free_codes: List[str] = [str(c) for c in range(CODE_MIN, CODE_MAX + 1)]
+        random.shuffle(self.free_codes)
+        # Salas ordenadas de la más inactiva a la más reciente
+        self.last_active: "OrderedDict[str, float]" = OrderedDict()
+
+    def get(self, code: str) -> Optional[GameRoom]:
+        return self.rooms.get(code)
+
+    def _take_code(self) -> str:
+        if not self.free_codes:
+            raise RuntimeError("No free room codes")
+        return self.free_codes.pop()
+
+    def _release_code(self, code: str):
+        # Se devuelve a una posición aleatoria para no reutilizarlo enseguida
+        self.free_codes.append(code)
+        i = random.randrange(len(self.free_codes))
+        self.free_codes[i], self.free_codes[-1] = self.free_codes[-1], self.free_codes[i]
+
+    async def create(self) -> GameRoom:
+        return self._add(self._take_code())
+
+    def _add(self, code: str) -> GameRoom:
+        room = GameRoom(code)
+        self.rooms[code] = room
+        self.last_active[code] = time.monotonic()
+        return room
+
+    async def adopt(self, rooms: Dict[str, GameRoom], previous_owners: Set[str]) -> List[GameRoom]:
+        adopted = [room for code, room in rooms.items() if code not in self.rooms]
+        for room in adopted:
+            self.rooms[room.room_code] = room
+            self.last_active[room.room_code] = time.monotonic()
+        # Una sola pasada por los códigos libres, no una por sala
+        self.free_codes = [code for code in self.free_codes if code not in self.rooms]
+        return adopted
+
+    async def remove(self, code: str):
+        if self.rooms.pop(code, None) is not None:
+            self.last_active.pop(code, None)
+            self._release_code(code)
+
+    def touch(self, code: str):
+        if code in self.last_active:
+            self.last_active[code] = time.monotonic()
+            self.last_active.move_to_end(code)
+
+    def oldest(self) -> Iterable[str]:
+        return iter(self.last_active)
+
+    def idle_for(self, code: str) -> float:
+        return time.monotonic() - self.last_active.get(code, time.monotonic())
+
+    async def owner_of(self, code: str) -> Optional[str]:
+        return WORKER_ID if code in self.rooms else None
+
+    def codes(self) -> Iterable[str]:
+        return self.rooms.keys()
+
+    def __len__(self) -> int:
+        return len(self.rooms)
+
+
+class RedisRoomStore(MemoryRoomStore):
+    # Las salas siguen en memoria del worker que las crea; Redis solo guarda
+    # qué worker es dueño de cada código para reservarlo y enrutar comandos.
+    # Cada worker renueva además su clave de latido: si muere, sus salas se
+    # dan por perdidas y cualquier otro puede reclamar sus códigos
+    def __init__(self, client, ttl: int = WORKER_TTL):
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+        self.task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        # El primer latido va antes de reclamar ningún código
+        await self.client.set(worker_key(WORKER_ID), 1, ex=self.ttl)
+        self.task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                await self.client.set(worker_key(WORKER_ID), 1, ex=self.ttl)
+            except Exception as e:
+                logger.warning("worker heartbeat failed: %r", e)
+
+    async def alive(self, owners: Iterable[str]) -> Set[str]:
+        owners = list(set(owners))
+        if not owners:
+            return set()
+        beats = await self.client.mget([worker_key(owner) for owner in owners])
+        return {owner for owner, beat in zip(owners, beats) if beat is not None}
+
+    async def _claim(self, code: str, previous_owners: Set[str] = frozenset()) -> bool:
+        key = room_key(code)
+        if await self.client.set(key, WORKER_ID, nx=True):
+            return True
+        # Ocupado: solo se queda con él si su dueño ya no late (o era este
+        # mismo worker antes de reiniciarse); WATCH evita que dos lo recuperen
+        from redis.exceptions import WatchError
+        async with self.client.pipeline() as pipe:
+            try:
+                await pipe.watch(key)
+                owner = await pipe.get(key)
+                if owner is not None:
+                    owner = owner.decode()
+                    if owner not in previous_owners and await self.alive([owner]):
+                        return False
+                pipe.multi()
+                pipe.set(key, WORKER_ID)
+                await pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    async def create(self) -> GameRoom:
+        taken = []
+        try:
+            while True:
+                code = self._take_code()
+                if await self._claim(code):
+                    return self._add(code)
+                # Lo tiene otro worker; se devuelve por si lo libera más tarde
+                taken.append(code)
+        finally:
+            for code in taken:
+                self._release_code(code)
+
+    async def adopt(self, rooms: Dict[str, GameRoom], previous_owners: Set[str]) -> List[GameRoom]:
+        # Solo las que siguen a nombre de este worker, de uno caído o de nadie
+        claimed = {}
+        for code, room in rooms.items():
+            if await self._claim(code, previous_owners):
+                claimed[code] = room
+        return await super().adopt(claimed, previous_owners)
+
+    async def remove(self, code: str):
+        await super().remove(code)
+        await self.client.delete(room_key(code))
+
+    async def owner_of(self, code: str) -> Optional[str]:
+        if code in self.rooms:
+            return WORKER_ID
+        owner = await self.client.get(room_key(code))
+        if owner is None:
+            return None
+        owner = owner.decode()
+        # Con el dueño caído la sala ya no existe
+        return owner if await self.alive([owner]) else None
+
+
+# Entrega los eventos de una sala a sus sockets, estén en el worker que estén,
+# y lleva los mensajes de los jugadores hasta el worker dueño de la sala
+class RoomBus(ABC):
+    def __init__(self):
+        self.on_event: Optional[Callable[[str, Optional[str], str], None]] = None
+        self.on_command: Optional[Callable[[str, str, dict], None]] = None
+
+    async def start(self, on_event: Callable[[str, Optional[str], str], None],
+                    on_command: Callable[[str, str, dict], None]):
+        self.on_event = on_event
+        self.on_command = on_command
+
+    async def stop(self):
+        pass
+
+    @abstractmethod
+    def publish(self, room_code: str, text: str, player_id: Optional[str] = None):
+        ...
+
+    @abstractmethod
+    def send_command(self, owner: str, room_code: str, player_id: str, message: dict):
+        ...
+
+    async def watch(self, room_code: str):
+        pass
+
+    async def unwatch(self, room_code: str):
+        pass
+
+
+class LocalRoomBus(RoomBus):
+    def publish(self, room_code: str, text: str, player_id: Optional[str] = None):
+        self.on_event(room_code, player_id, text)
+
+    def send_command(self, owner: str, room_code: str, player_id: str, message: dict):
+        self.on_command(room_code, player_id, message)
+
+
+class RedisRoomBus(RoomBus):
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+        self.pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self.outbox: asyncio.Queue = asyncio.Queue()
+        self.tasks = []
+
+    def _room_channel(self, room_code: str) -> str:
+        return f"{KEY_PREFIX}:events:{room_code}"
+
+    def _worker_channel(self, worker_id: str) -> str:
+        return f"{KEY_PREFIX}:commands:{worker_id}"
+
+    async def start(self, on_event, on_command):
+        await super().start(on_event, on_command)
+        await self.pubsub.subscribe(self._worker_channel(WORKER_ID))
+        self.tasks = [asyncio.create_task(self._publisher()), asyncio.create_task(self._listener())]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await self.pubsub.close()
+
+    # Un único publicador conserva el orden de los eventos de cada sala
+    async def _publisher(self):
+        while True:
+            channel, payload = await self.outbox.get()
+            try:
+                await self.client.publish(channel, payload)
+            except Exception as e:
+                logger.warning("redis publish failed: %r", e)
+
+    async def _listener(self):
+        async for message in self.pubsub.listen():
+            try:
+                payload = json.loads(message["data"])
+                channel = message["channel"].decode()
+                if channel.startswith(f"{KEY_PREFIX}:events:"):
+                    self.on_event(payload["room"], payload.get("to"), payload["text"])
+                else:
+                    self.on_command(payload["room"], payload["player_id"], payload["message"])
+            except Exception as e:
+                logger.warning("bad bus message: %r", e)
+
+    def publish(self, room_code: str, text: str, player_id: Optional[str] = None):
+        payload = json.dumps({"room": room_code, "to": player_id, "text": text})
+        self.outbox.put_nowait((self._room_channel(room_code), payload))
+
+    def send_command(self, owner: str, room_code: str, player_id: str, message: dict):
+        if owner == WORKER_ID:
+            self.on_command(room_code, player_id, message)
+            return
+        payload = json.dumps({"room": room_code, "player_id": player_id, "message": message})
+        self.outbox.put_nowait((self._worker_channel(owner), payload))
+
+    async def watch(self, room_code: str):
+        await self.pubsub.subscribe(self._room_channel(room_code))
+
+    async def unwatch(self, room_code: str):
+        await self.pubsub.unsubscribe(self._room_channel(room_code))
+
+
+def make_backend(backend: str = ROOM_BACKEND):
+    if backend == "memory":
+        return MemoryRoomStore(), LocalRoomBus()
+    if backend == "redis":
+        # Solo se importa si se usa: con el backend en memoria no cuesta arranque
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            raise RuntimeError("ROOM_BACKEND=redis requires the 'redis' package")
+        client = aioredis.from_url(REDIS_URL)
+        return RedisRoomStore(client), RedisRoomBus(client)
+    raise ValueError(f"Unknown ROOM_BACKEND: {backend}")
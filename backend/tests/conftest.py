@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los módulos del backend se importan por nombre, como hace uvicorn con main:app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
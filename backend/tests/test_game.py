@@ -0,0 +1,72 @@
+from game import GameRoom
+
+
+def guessing_room(players=("a", "b", "c"), rounds=2):
+    room = GameRoom("1000")
+    for pid in players:
+        room.add_player(pid, pid.upper())
+        room.set_connected(pid, True)
+    room.start_round(rounds, "battery")
+    room.fill_missing_clues("pista")
+    room.start_guessing_phase()
+    return room
+
+
+def test_rejoin_after_expire_restores_clues():
+    room = guessing_room()
+    owner = room.current_clue_owner_id
+    clues = [clue.phrase for clue in room.players[owner].clues]
+    seat = room.players[owner].seat
+
+    # Se le acaba la gracia de reconexión a mitad de su pista y vuelve a entrar
+    room.set_connected(owner, False)
+    room.remove_player(owner)
+    room.set_connected(owner, True)
+    player = room.add_player(owner, "Otra vez")
+
+    assert owner not in room.departed
+    assert player.seat == seat
+    assert [clue.phrase for clue in player.clues] == clues
+    assert room.get_current_clue_info()["owner_name"] == "Otra vez"
+    for pid in room.players:
+        if pid != owner:
+            room.submit_guess(pid, room.targets[room.current_guess_index])
+    assert room.all_active_guessed()
+    assert room.reveal_current()["points_this_dial"] == 4
+
+
+def test_rejoin_gets_new_seat_if_taken():
+    room = guessing_room()
+    owner = room.current_clue_owner_id
+    seat = room.players[owner].seat
+    room.remove_player(owner)
+    room.add_player("d", "D")
+    player = room.add_player(owner, owner.upper())
+
+    assert room.players["d"].seat == seat
+    assert player.seat != seat
+    assert len(player.clues) == 2
+    while room.next_clue():
+        assert room.get_current_clue_info() is not None
+        room.reveal_current()
+
+
+def test_departed_owner_still_revealed():
+    room = guessing_room()
+    owner = room.current_clue_owner_id
+    room.remove_player(owner)
+
+    assert room.get_current_clue_info()["owner_id"] == owner
+    room.reveal_current()
+    assert room.next_clue()
+
+
+def test_total_dials_counts_departed_clues():
+    room = guessing_room(rounds=2)
+    assert room.total_dials == 6
+    room.remove_player("c")
+    played = 1
+    while room.next_clue():
+        played += 1
+    # Las pistas de quien se fue se siguen jugando y van a la tabla de 6
+    assert played == room.total_dials == 6
@@ -0,0 +1,121 @@
+import asyncio
+import os
+
+from game import GameRoom
+from journal import Journal
+
+
+def playing_room(code, players=4):
+    room = GameRoom(code)
+    for i in range(players):
+        room.add_player(f"p{i}", f"P{i}")
+    room.start_round(2, "free")
+    return room
+
+
+def play(journal, room):
+    # Mismas operaciones y deltas que registran los handlers de main
+    for pid in list(room.players):
+        room.submit_clue(pid, f"pista {pid}")
+        journal.record(room, "clue", pid, f"pista {pid}")
+    room.fill_missing_clues("pista")
+    room.start_guessing_phase()
+    journal.save(room)
+    owner = room.current_clue_owner_id
+    guessers = [pid for pid in room.players if pid != owner]
+    room.submit_guess(guessers[0], 40)
+    journal.record(room, "guess", guessers[0], 40)
+    room.last_needle_position = 120
+    room.clear_ready()
+    journal.record(room, "needle", 120)
+    room.submit_guess(guessers[1], 120)
+    journal.record(room, "guess", guessers[1], 120)
+    room.cancel_guess(guessers[1])
+    journal.record(room, "cancel", guessers[1])
+
+
+def restored(directory):
+    return {code: room.to_state() for code, room in Journal(str(directory)).restore().items()}
+
+
+def test_record_then_restore(tmp_path):
+    async def run():
+        journal = Journal(str(tmp_path), flush_interval=0)
+        journal.restore()
+        rooms = {code: playing_room(code) for code in ("1000", "1001", "1002")}
+        for room in rooms.values():
+            journal.save(room)
+        for room in rooms.values():
+            play(journal, room)
+        journal.drop("1002")
+        await journal.flush()
+        return rooms
+
+    rooms = asyncio.run(run())
+    expected = {code: rooms[code].to_state() for code in ("1000", "1001")}
+    assert restored(tmp_path) == expected
+
+
+def test_restore_after_compact(tmp_path):
+    async def run():
+        journal = Journal(str(tmp_path), flush_interval=0)
+        journal.restore()
+        room = playing_room("1000")
+        journal.save(room)
+        await journal.compact()
+        play(journal, room)
+        await journal.flush()
+        return room
+
+    room = asyncio.run(run())
+    assert restored(tmp_path) == {"1000": room.to_state()}
+
+
+def test_truncated_tail_is_skipped(tmp_path):
+    async def run():
+        journal = Journal(str(tmp_path), flush_interval=0)
+        journal.restore()
+        room = playing_room("1000")
+        journal.save(room)
+        await journal.flush()
+        state = room.to_state()
+        room.submit_clue("p0", "perdida")
+        journal.record(room, "clue", "p0", "perdida")
+        await journal.flush()
+        journal.file.close()
+        return state
+
+    state = asyncio.run(run())
+    # Corte a mitad de la última línea: se recupera lo anterior
+    path = os.path.join(tmp_path, "journal-00000000.log")
+    with open(path, "r+", encoding="utf-8") as f:
+        f.truncate(os.path.getsize(path) - 5)
+    assert restored(tmp_path) == {"1000": state}
+
+
+def test_needle_move_over_tail_limit(tmp_path, monkeypatch):
+    # Con la cola llena record guarda la sala entera: tiene que ir ya movida
+    import main
+    from messages import MoveNeedle
+
+    async def run():
+        journal = Journal(str(tmp_path), flush_interval=0, tail_limit=1)
+        journal.restore()
+        monkeypatch.setattr(main, "journal", journal)
+        monkeypatch.setattr(main.bus, "on_event", lambda *event: None)
+        room = playing_room("1000")
+        room.fill_missing_clues("pista")
+        room.start_guessing_phase()
+        journal.save(room)
+        guesser = next(pid for pid in room.players if pid != room.current_clue_owner_id)
+        for position in (40, 50, 60):
+            room.submit_guess(guesser, position)
+            journal.record(room, "guess", guesser, position)
+        await main.on_move_needle(room, "1000", guesser, MoveNeedle(type="move_needle", position=120))
+        await journal.flush()
+        return room
+
+    room = asyncio.run(run())
+    restored_room = Journal(str(tmp_path)).restore()["1000"]
+    assert restored_room.to_state() == room.to_state()
+    assert (restored_room.ready_total, restored_room.last_needle_position) == (0, 120)
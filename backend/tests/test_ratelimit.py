@@ -0,0 +1,44 @@
+import pytest
+
+import ratelimit
+from ratelimit import RateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_burst_then_reject(clock):
+    limiter = RateLimiter({"move_needle": (10, 3)})
+    assert [limiter.allow("move_needle") for _ in range(4)] == [True, True, True, False]
+
+
+def test_refill(clock):
+    limiter = RateLimiter({"move_needle": (4, 3)})
+    for _ in range(3):
+        limiter.allow("move_needle")
+    clock[0] += 0.125
+    assert not limiter.allow("move_needle")
+    clock[0] += 0.125
+    assert limiter.allow("move_needle")
+    assert not limiter.allow("move_needle")
+
+
+def test_refill_capped_at_burst(clock):
+    limiter = RateLimiter({"move_needle": (10, 3)})
+    limiter.allow("move_needle")
+    clock[0] += 60
+    assert [limiter.allow("move_needle") for _ in range(4)] == [True, True, True, False]
+
+
+def test_types_are_independent(clock):
+    limiter = RateLimiter({"move_needle": (10, 1)}, default=(1, 2))
+    assert limiter.allow("move_needle")
+    assert not limiter.allow("move_needle")
+    # Un tipo saturado no bloquea a los demás, que usan el ritmo por defecto
+    assert limiter.allow("submit_guess")
+    assert limiter.allow("submit_guess")
+    assert not limiter.allow("submit_guess")
@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from game import GameRoom
+from scoring import RULE_SETS, load_numpy, pack, rescore, rescore_batch
+
+pytestmark = pytest.mark.skipif(load_numpy() is None, reason="numpy not installed")
+
+
+def random_games(count, seed=1):
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        dials = []
+        for _ in range(rng.randint(1, 8)):
+            target = rng.randint(5, 175)
+            guesses = [
+                [rng.randint(0, 1), rng.choice([0, 180, target, rng.randint(0, 180)])]
+                for _ in range(rng.randint(0, 7))
+            ]
+            dials.append({"target": target, "owner_team": rng.randint(0, 1), "guesses": guesses})
+        games.append({"scoring": "coop", "dials": dials})
+    return games
+
+
+@pytest.mark.parametrize("name", sorted(RULE_SETS))
+def test_batch_matches_scalar(name):
+    games = random_games(500)
+    rules = RULE_SETS[name]
+    assert rescore_batch(pack(games), rules) == rescore(games, rules)
+
+
+@pytest.mark.parametrize("name", sorted(RULE_SETS))
+def test_rescore_matches_played_game(name):
+    # El dial_log de una partida jugada vuelve a dar los mismos puntos
+    rng = random.Random(3)
+    room = GameRoom("1000")
+    for i in range(5):
+        room.add_player(f"p{i}", f"P{i}")
+        room.set_connected(f"p{i}", True)
+    room.start_round(3, "free", scoring=name)
+    room.fill_missing_clues("pista")
+    room.start_guessing_phase()
+    while True:
+        for pid in room.players:
+            if rng.random() < 0.8:
+                room.submit_guess(pid, rng.randint(0, 180))
+        room.reveal_current()
+        if not room.next_clue():
+            break
+    game = {"scoring": name, "dials": room.dial_log}
+    assert rescore([game], room.rules) == [room.team_score]
+    assert rescore_batch(pack([game]), room.rules) == [room.team_score]
+
+
+def test_exact_mean_thresholds():
+    coop = RULE_SETS["coop"]
+    # Media 95.5 frente a 90: distancia 5.5, ya fuera de la zona de 4
+    assert coop.score(90, [("a", 0, 95), ("b", 0, 96)]).points == 3
+    assert coop.score(90, [("a", 0, 95), ("b", 0, 95)]).points == 4
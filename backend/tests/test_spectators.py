@@ -0,0 +1,45 @@
+import asyncio
+import json
+
+from spectators import SpectatorFeed
+
+
+def published(texts):
+    async def run():
+        feed = SpectatorFeed(tick_hz=10)
+        feed.add("1000", "s1", websocket=None)
+        for text in texts:
+            feed.publish("1000", json.dumps(text))
+        audience = feed.rooms["1000"]
+        events = json.loads(feed._take_frame(audience))["events"]
+        feed.remove("1000", "s1")
+        return events, audience.stats.coalesced
+
+    return asyncio.run(run())
+
+
+def needle(position, **counts):
+    return {"type": "needle_moved", "position": position, "player_id": "p1", **counts}
+
+
+def ready(count):
+    return {"type": "player_ready", "player_id": "p2", "is_ready": True, "ready_count": count,
+            "total_guessers": 2, "v": 1}
+
+
+def test_consecutive_needles_coalesce():
+    events, coalesced = published([needle(10), needle(20), needle(30)])
+    assert events == [needle(30)]
+    assert coalesced == 2
+
+
+def test_needle_after_other_event_keeps_order():
+    # La aguja que borra los "listos" no puede quedar delante del player_ready
+    events, coalesced = published([needle(10), ready(1), needle(20, ready_count=0, total_guessers=2)])
+    assert events == [needle(10), ready(1), needle(20, ready_count=0, total_guessers=2)]
+    assert coalesced == 0
+
+
+def test_needle_after_other_event_coalesces_with_later_needles():
+    events, _ = published([needle(10), ready(1), needle(20), needle(30)])
+    assert events == [needle(10), ready(1), needle(30)]
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from wire import compact_frame, decode_compact, encode_compact
+
+MESSAGES = [
+    {"type": "needle_moved", "position": 97, "player_id": "k3j9x0ab"},
+    {"type": "needle_moved", "position": 0, "player_id": "k3j9x0ab", "ready_count": 3, "total_guessers": 7},
+    {"type": "needle_moved", "position": 180, "player_id": "jugadór"},
+    {"type": "player_ready", "player_id": "k3j9x0ab", "is_ready": True,
+     "ready_count": 3, "total_guessers": 7, "v": 4182},
+    {"type": "player_ready", "player_id": "k3j9x0ab", "is_ready": False,
+     "ready_count": 0, "total_guessers": 7, "v": 2 ** 32 - 1},
+]
+
+
+@pytest.mark.parametrize("message", MESSAGES)
+def test_round_trip(message):
+    assert decode_compact(encode_compact(message)) == message
+
+
+@pytest.mark.parametrize("message", MESSAGES)
+def test_frame_from_server_text(message):
+    # El servidor serializa con json.dumps por defecto antes de decidir el formato
+    assert decode_compact(compact_frame(json.dumps(message))) == message
+
+
+@pytest.mark.parametrize("message", [
+    {"type": "needle_moved", "position": 300, "player_id": "p1"},
+    {"type": "needle_moved", "position": 90.5, "player_id": "p1"},
+    {"type": "needle_moved", "position": 90, "player_id": "p1", "extra": 1},
+    {"type": "needle_moved", "position": 90, "player_id": "p1", "ready_count": 256, "total_guessers": 3},
+    {"type": "player_ready", "player_id": "p1", "is_ready": True, "ready_count": 1, "total_guessers": 3,
+     "v": 1, "players": []},
+    {"type": "game_state", "v": 1},
+])
+def test_falls_back_to_json(message):
+    assert encode_compact(message) is None
+    assert compact_frame(json.dumps(message)) is None
+
+
+def test_unknown_frame_type():
+    with pytest.raises(ValueError):
+        decode_compact(b"\x09\x00\x00")
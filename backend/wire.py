@@ -0,0 +1,85 @@
+import json
+import struct
+from typing import Optional
+
+# Protocolos que puede pedir el cliente al conectar (?proto=...)
+PROTO_JSON = "json"
+PROTO_COMPACT = "compact"
+PROTOCOLS = (PROTO_JSON, PROTO_COMPACT)
+
+# Formato binario de los mensajes más frecuentes (little-endian):
+#   needle_moved: u8 tipo=1 | u8 flags | u8 posición | [u8 listos | u8 total] | player_id utf-8
+#   player_ready: u8 tipo=2 | u8 flags | u32 versión | u8 listos | u8 total | player_id utf-8
+# El resto de mensajes siguen yendo en JSON también en modo compacto.
+NEEDLE_MOVED = 1
+PLAYER_READY = 2
+
+FLAG_COUNTS = 1
+FLAG_READY = 2
+
+NEEDLE_KEYS = {"type", "position", "player_id"}
+READY_KEYS = {"type", "player_id", "is_ready", "ready_count", "total_guessers", "v"}
+
+HEADER = struct.Struct("<BBB")
+COUNTS = struct.Struct("<BB")
+READY = struct.Struct("<BBIBB")
+
+
+def is_byte(value) -> bool:
+    return type(value) is int and 0 <= value <= 255
+
+
+def encode_compact(message: dict) -> Optional[bytes]:
+    msg_type = message.get("type")
+    if msg_type == "needle_moved":
+        has_counts = "ready_count" in message
+        if set(message) - NEEDLE_KEYS - ({"ready_count", "total_guessers"} if has_counts else set()):
+            return None
+        if not is_byte(message["position"]):
+            return None
+        frame = HEADER.pack(NEEDLE_MOVED, FLAG_COUNTS if has_counts else 0, message["position"])
+        if has_counts:
+            if not (is_byte(message["ready_count"]) and is_byte(message["total_guessers"])):
+                return None
+            frame += COUNTS.pack(message["ready_count"], message["total_guessers"])
+        return frame + str(message["player_id"]).encode()
+    if msg_type == "player_ready":
+        # Con la lista de jugadores incluida no compensa: se manda en JSON
+        if set(message) != READY_KEYS:
+            return None
+        if not (is_byte(message["ready_count"]) and is_byte(message["total_guessers"])):
+            return None
+        flags = FLAG_READY if message["is_ready"] else 0
+        frame = READY.pack(PLAYER_READY, flags, message["v"], message["ready_count"], message["total_guessers"])
+        return frame + str(message["player_id"]).encode()
+    return None
+
+
+def compact_frame(text: str) -> Optional[bytes]:
+    # Solo merece la pena parsear los tipos que tienen formato binario
+    if not (text.startswith('{"type": "needle_moved"') or text.startswith('{"type": "player_ready"')):
+        return None
+    return encode_compact(json.loads(text))
+
+
+def decode_compact(frame: bytes) -> dict:
+    msg_type, flags = frame[0], frame[1]
+    if msg_type == NEEDLE_MOVED:
+        message = {"type": "needle_moved", "position": frame[2]}
+        offset = HEADER.size
+        if flags & FLAG_COUNTS:
+            message["ready_count"], message["total_guessers"] = COUNTS.unpack_from(frame, offset)
+            offset += COUNTS.size
+        message["player_id"] = frame[offset:].decode()
+        return message
+    if msg_type == PLAYER_READY:
+        _, _, version, ready_count, total_guessers = READY.unpack_from(frame)
+        return {
+            "type": "player_ready",
+            "v": version,
+            "is_ready": bool(flags & FLAG_READY),
+            "ready_count": ready_count,
+            "total_guessers": total_guessers,
+            "player_id": frame[READY.size:].decode(),
+        }
+    raise ValueError(f"Unknown compact frame type {msg_type}")
@@ -20,7 +20,22 @@ function App() {
       setGameState(prev => ({ ...prev, ...msg }))
     }
     if (msg.type === "writing_progress") {
-      setGameState(prev => ({ ...prev, players: msg.players }))
+      setGameState(prev => ({ ...prev, players: msg.players ?? prev.players }))
+    }
+    if (msg.type === "snapshot") {
+      setReadyPlayers(new Set(msg.ready_players || []))
+      setGameState(prev => ({
+        ...prev, ...msg,
+        needlePosition: msg.needle_position ?? 90,
+        finalNeedleAngle: msg.needle_position,
+      }))
+      if (msg.state === "waiting") setScreen("lobby")
+      if (msg.state === "writing") setScreen("writing")
+      if (msg.state === "guessing") setScreen(msg.points_this_dial !== undefined ? "reveal" : "guessing")
+      if (msg.state === "finished") setScreen("reveal")
+    }
+    if (msg.type === "resumed") {
+      setGameState(prev => ({ ...prev, needlePosition: msg.needle_position ?? prev.needlePosition }))
     }
     if (msg.type === "lobby_settings") {
       setGameState(prev => ({ ...prev, ...msg }))
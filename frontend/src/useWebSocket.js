@@ -3,8 +3,45 @@ import { useEffect, useRef, useState } from "react"
 const WS_BACKEND = "wss://wavelength-production.up.railway.app"
 //const WS_BACKEND = "ws://127.0.0.1:8000"
 
+// "json" (por defecto) o "compact": needle_moved y player_ready llegan en binario
+const WIRE_PROTO = import.meta.env.VITE_WIRE_PROTO || "json"
+
+const textDecoder = new TextDecoder()
+
+// Mismo formato que backend/wire.py
+function decodeCompact(buffer) {
+  const view = new DataView(buffer)
+  const type = view.getUint8(0)
+  const flags = view.getUint8(1)
+  if (type === 1) {
+    const message = { type: "needle_moved", position: view.getUint8(2) }
+    let offset = 3
+    if (flags & 1) {
+      message.ready_count = view.getUint8(3)
+      message.total_guessers = view.getUint8(4)
+      offset = 5
+    }
+    message.player_id = textDecoder.decode(new Uint8Array(buffer, offset))
+    return message
+  }
+  if (type === 2) {
+    return {
+      type: "player_ready",
+      is_ready: Boolean(flags & 2),
+      v: view.getUint32(2, true),
+      ready_count: view.getUint8(6),
+      total_guessers: view.getUint8(7),
+      player_id: textDecoder.decode(new Uint8Array(buffer, 8)),
+    }
+  }
+  return null
+}
+
 let globalSocket = null
 let globalRoomCode = null
+// Última versión de estado recibida, para reanudar tras una reconexión
+let globalVersion = null
+let reconnectTimer = null
 
 export function useWebSocket(roomCode, playerId, playerName, onMessage) {
   const [connected, setConnected] = useState(false)
@@ -23,31 +60,49 @@ export function useWebSocket(roomCode, playerId, playerName, onMessage) {
     }
 
     if (globalSocket) {
-      globalSocket.close()
+      const old = globalSocket
       globalSocket = null
+      old.close()
     }
+    clearTimeout(reconnectTimer)
 
+    if (globalRoomCode !== roomCode) globalVersion = null
     globalRoomCode = roomCode
-    const ws = new WebSocket(`${WS_BACKEND}/ws/${roomCode}/${playerId}`)
-    globalSocket = ws
 
-    ws.onopen = () => {
-      setConnected(true)
-      ws.send(JSON.stringify({ type: "join", name: playerName }))
-    }
+    const connect = (attempt) => {
+      const params = new URLSearchParams()
+      if (WIRE_PROTO !== "json") params.set("proto", WIRE_PROTO)
+      if (globalVersion !== null) params.set("last_seen_version", globalVersion)
+      const query = params.toString() ? `?${params}` : ""
+      const ws = new WebSocket(`${WS_BACKEND}/ws/${roomCode}/${playerId}${query}`)
+      ws.binaryType = "arraybuffer"
+      globalSocket = ws
 
-    ws.onmessage = (event) => {
-      const message = JSON.parse(event.data)
-      onMessageRef.current(message)
-    }
+      ws.onopen = () => {
+        attempt = 0
+        setConnected(true)
+        ws.send(JSON.stringify({ type: "join", name: playerName }))
+      }
 
-    ws.onclose = () => {
-      setConnected(false)
-      if (globalSocket === ws) {
-        globalSocket = null
-        globalRoomCode = null
+      ws.onmessage = (event) => {
+        const message = typeof event.data === "string" ? JSON.parse(event.data) : decodeCompact(event.data)
+        if (!message) return
+        if (message.v !== undefined) globalVersion = message.v
+        onMessageRef.current(message)
+      }
+
+      ws.onclose = () => {
+        if (globalSocket !== ws) return
+        setConnected(false)
+        // Cierre inesperado (red móvil, etc.): reintentar manteniendo la sala
+        const delay = Math.min(1000 * 2 ** attempt, 10000)
+        reconnectTimer = setTimeout(() => {
+          if (globalSocket === ws && globalRoomCode === roomCode) connect(attempt + 1)
+        }, delay)
       }
     }
+
+    connect(0)
   }, [roomCode, playerId])
 
   const send = (message) => {